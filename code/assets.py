@@ -0,0 +1,216 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+from time import perf_counter
+
+import pygame
+
+PACK_MAGIC = b'SSPK'
+PACK_VERSION = 2  # 2: frames generated from the images (see AssetManager.frames)
+PACK_HEADER = struct.Struct('<4sII')  # magic, format version, length of the JSON index
+
+# Stand-in for sounds that are missing or cannot be played, so callers never have to check
+class SilentSound:
+    def play(self, *args, **kwargs):
+        return None
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+    def get_length(self):
+        return 0
+
+# Loads images lazily, decodes them ahead of time on a thread pool and keeps a packed pixel cache on disk, which also
+# holds frames the game generates from the images (such as the meteor rotation atlas)
+class AssetManager:
+    def __init__(self, image_files, cache_path=None, workers=4):
+        self.image_files = list(image_files)  # Every image the game may ask for (relative paths)
+        self.cache_path = cache_path  # Packed cache file, or None to always decode the source images
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='assets')
+        self.images = {}  # path -> surface converted for the display
+        self.pending = {}  # path -> future of the decoded, not yet converted surface
+        self.pack = None  # Memory map of a valid cache file
+        self.pack_index = {}  # path -> (offset, width, height) inside the cache file
+        self.frame_index = {}  # name -> [(offset, width, height, info)] of generated frames inside the cache file
+        self.sources = {}  # path -> future of the decoded image, kept for rewriting the cache file
+        self.generated = {}  # name -> [(surface, info)] generated this run, written with the next cache file
+        self.write_lock = threading.Lock()  # Rewrites may be queued while an earlier one is still running
+        self.stats = {'pack_hits': 0, 'decoded': 0, 'pack_frames': 0, 'generated_frames': 0, 'missing_sounds': 0}
+        self.open_pack()
+
+    def signature(self):
+        """Describe the source files, so a cache built from different files is not used."""
+        sources = {}
+        for path in self.image_files:
+            info = os.stat(path)
+            sources[path] = [info.st_mtime_ns, info.st_size]
+        return sources
+
+    def open_pack(self):
+        """Memory-map the cache file if it exists and matches the current source images."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        pack = None
+        try:
+            with open(self.cache_path, 'rb') as file:
+                pack = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)  # ValueError for an empty file
+            magic, version, index_size = PACK_HEADER.unpack_from(pack)
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise ValueError('not an asset pack of this version')
+            index = json.loads(pack[PACK_HEADER.size:PACK_HEADER.size + index_size])
+            if index['sources'] != self.signature():
+                raise ValueError('asset pack built from other images')
+            data_start = PACK_HEADER.size + index_size  # Offsets in the index are relative to the pixel data
+            pack_index = {path: (offset + data_start, width, height) for path, (offset, width, height) in index['entries'].items()}
+            frame_index = {name: [(offset + data_start, width, height, info) for offset, width, height, info in frames]
+                           for name, frames in index['frames'].items()}
+            blocks = [*pack_index.values(), *(frame[:3] for frames in frame_index.values() for frame in frames)]
+            if any(offset + width * height * 4 > len(pack) for offset, width, height in blocks):
+                raise ValueError('asset pack is cut short')
+        except (OSError, struct.error, ValueError, KeyError, TypeError):
+            if pack is not None:
+                pack.close()
+            return  # Stale or corrupt: images are decoded from the source files and write_pack() rebuilds the cache
+        self.pack = pack
+        self.pack_index = pack_index
+        self.frame_index = frame_index
+
+    def packed(self, offset, width, height):
+        """Return an unconverted surface over pixels stored in the cache file."""
+        return pygame.image.frombuffer(memoryview(self.pack)[offset:offset + width * height * 4], (width, height), 'RGBA')
+
+    def decode(self, path):
+        """Return an unconverted surface for an image, from the cache file when possible (safe to call from threads)."""
+        entry = self.pack_index.get(path)
+        if entry:
+            self.stats['pack_hits'] += 1
+            return self.packed(*entry)
+        self.stats['decoded'] += 1
+        return pygame.image.load(path)
+
+    def prefetch(self, paths=None):
+        """Start decoding images in the background; write a fresh cache file once they are done if needed."""
+        paths = self.image_files if paths is None else paths
+        for path in paths:
+            if path not in self.images and path not in self.pending:
+                self.pending[path] = self.sources[path] = self.executor.submit(self.decode, path)
+        if self.cache_path and self.pack is None:
+            self.save_pack()
+
+    def save_pack(self):
+        """Queue a rewrite of the cache file with every source image and the frames generated so far."""
+        for path in self.image_files:
+            if path not in self.sources:
+                self.sources[path] = self.executor.submit(self.decode, path)
+        self.executor.submit(self.write_pack, dict(self.sources))
+
+    def image(self, path):
+        """Return an image converted for the display, decoding it now if it was not prefetched."""
+        surf = self.images.get(path)
+        if surf is None:
+            future = self.pending.pop(path, None)
+            decoded = future.result() if future else self.decode(path)
+            surf = self.images[path] = decoded.convert_alpha()  # Conversion needs the display, so it happens here
+        return surf
+
+    def frames(self, name, build):
+        """Return the (surface, info) frames build() makes from the images, converted for the display; they come from the
+        cache file when it has them under this name, otherwise build() runs and the cache file is rewritten with them.
+        The name must change whenever build() would give other frames, and info must survive a JSON round trip."""
+        entries = self.frame_index.get(name)
+        if entries is not None:
+            self.stats['pack_frames'] += len(entries)
+            return [(self.packed(offset, width, height).convert_alpha(), info) for offset, width, height, info in entries]
+        frames = build()
+        self.stats['generated_frames'] += len(frames)
+        if self.cache_path:
+            self.generated[name] = frames
+            self.save_pack()
+        return frames
+
+    def sound(self, path, volume=None):
+        """Load a sound, or return a SilentSound if the file is missing or there is no audio device."""
+        if not os.path.exists(path) or not pygame.mixer.get_init():
+            self.stats['missing_sounds'] += 1
+            return SilentSound()
+        sound = pygame.mixer.Sound(path)
+        if volume is not None:
+            sound.set_volume(volume)
+        return sound
+
+    def font(self, path, size):
+        """Load a font."""
+        return pygame.font.Font(path, size)
+
+    def write_pack(self, futures):
+        """Write every decoded image and generated frame as raw RGBA into one cache file that can be memory-mapped later."""
+        surfaces = {path: future.result() for path, future in futures.items()}
+        with self.write_lock:  # Frames generated while waiting are written too, so the last rewrite has everything
+            entries = {}
+            frames = {}
+            blobs = []
+            offset = 0
+            for path, surf in surfaces.items():
+                data = pygame.image.tobytes(surf, 'RGBA')
+                entries[path] = [offset, surf.get_width(), surf.get_height()]
+                blobs.append(data)
+                offset += len(data)
+            for name, generated in list(self.generated.items()):
+                frames[name] = []
+                for surf, info in generated:
+                    data = pygame.image.tobytes(surf, 'RGBA')
+                    frames[name].append([offset, surf.get_width(), surf.get_height(), info])
+                    blobs.append(data)
+                    offset += len(data)
+            for name, packed in self.frame_index.items():
+                if name in frames:
+                    continue
+                frames[name] = []  # Not asked for this run, carried over from the current cache file
+                for old_offset, width, height, info in packed:
+                    frames[name].append([offset, width, height, info])
+                    blobs.append(self.pack[old_offset:old_offset + width * height * 4])
+                    offset += width * height * 4
+            index = json.dumps({'sources': self.signature(), 'entries': entries, 'frames': frames}).encode()
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            temporary_path = self.cache_path + '.tmp'
+            with open(temporary_path, 'wb') as file:
+                file.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index)))
+                file.write(index)
+                for data in blobs:
+                    file.write(data)
+            os.replace(temporary_path, self.cache_path)  # Never leave a half-written cache behind
+
+    def shutdown(self):
+        """Wait for background work (including a cache rebuild) to finish."""
+        self.executor.shutdown(wait=True)
+
+def measure_startup(image_files, cache_path):
+    """Time loading every image without a cache file (cold) and again from the cache file (warm)."""
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    timings = {}
+    for run in ('cold', 'warm'):
+        start = perf_counter()
+        manager = AssetManager(image_files, cache_path)
+        manager.prefetch()
+        for path in image_files:
+            manager.image(path)
+        timings[run] = perf_counter() - start
+        manager.shutdown()  # Lets the cold run finish writing the cache file
+        print(f"{run}: {timings[run] * 1000:.1f} ms for {len(image_files)} images "
+              f"({manager.stats['pack_hits']} from the cache file, {manager.stats['decoded']} decoded)")
+    return timings
+
+if __name__ == '__main__':
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((1, 1))  # convert_alpha needs a display
+    image_files = sorted(join(folder, name) for folder, _, names in os.walk('images') for name in names if name.endswith('.png'))
+    measure_startup(image_files, join('.cache', 'assets.pack'))
@@ -0,0 +1,98 @@
+import os
+from time import perf_counter
+
+import pygame
+
+# Plays sound effects on a fixed budget of mixer channels, stealing the least important voice when all are busy
+class AudioManager:
+    def __init__(self, voices=8):
+        self.enabled = bool(pygame.mixer.get_init())  # No audio device: every call is a cheap no-op
+        self.sounds = {}  # name -> (sound, priority)
+        self.channels = []
+        if self.enabled:
+            pygame.mixer.set_num_channels(voices)  # The whole budget, nothing else plays effects
+            self.channels = [pygame.mixer.Channel(index) for index in range(voices)]
+        self.voice_priority = [0] * len(self.channels)  # Priority of the sound each channel last started
+        self.voice_started = [0.0] * len(self.channels)  # When it was started
+        self.frame_sounds = set()  # Names already played this frame
+        self.music_path = None  # Track currently streaming, None when no music is playing
+        self.stats = {'played': 0, 'deduplicated': 0, 'stolen': 0, 'dropped': 0}
+
+    def load(self, name, sound, priority=0):
+        """Register a loaded sound (or SilentSound) under a name; higher priority sounds may interrupt lower ones."""
+        self.sounds[name] = (sound, priority)
+
+    def play(self, name):
+        """Play a sound once per frame on a free voice, or on the least important busy one if it matters less."""
+        if name in self.frame_sounds:
+            self.stats['deduplicated'] += 1  # Ten explosions in one frame sound like one, only louder and clipped
+            return None
+        self.frame_sounds.add(name)
+        sound, priority = self.sounds[name]
+        if not self.enabled:
+            return None
+
+        voice = None
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                voice = index
+                break
+        if voice is None:
+            # Steal the lowest priority voice, the oldest one among equals, unless every voice matters more
+            voice = min(range(len(self.channels)), key=lambda index: (self.voice_priority[index], self.voice_started[index]))
+            if self.voice_priority[voice] > priority:
+                self.stats['dropped'] += 1
+                return None
+            self.stats['stolen'] += 1
+        channel = self.channels[voice]
+        channel.play(sound)  # Replaces whatever the channel was playing
+        self.voice_priority[voice] = priority
+        self.voice_started[voice] = perf_counter()
+        self.stats['played'] += 1
+        return channel
+
+    def end_frame(self):
+        """Start a new frame for de-duplication."""
+        self.frame_sounds.clear()
+
+    def play_music(self, path, volume=None, loops=-1):
+        """Stream a music track from disk (looping by default); returns False if the file or audio device is missing."""
+        if not self.enabled or not os.path.exists(path):
+            return False
+        if self.music_path != path:
+            pygame.mixer.music.load(path)  # Streamed while playing, never decoded into memory as a whole
+            self.music_path = path
+        if volume is not None:
+            pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops)
+        return True
+
+    def stop_music(self, fade_ms=500):
+        """Fade out the music track, if one is playing."""
+        if self.enabled and self.music_path:
+            pygame.mixer.music.fadeout(fade_ms)
+
+    def report(self):
+        """Return the counters as one line of text."""
+        return ', '.join(f'{count} {name}' for name, count in self.stats.items())
+
+def stress(voices=8, frames=120, explosions_per_frame=30):
+    """Fire a burst of lasers and explosions every frame and report how the voice budget coped."""
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.mixer.init()
+    audio = AudioManager(voices)
+    audio.load('laser', pygame.mixer.Sound(os.path.join('audio', 'laser.wav')), priority=1)
+    audio.load('explosion', pygame.mixer.Sound(os.path.join('audio', 'explosion.wav')), priority=2)
+    start = perf_counter()
+    for _ in range(frames):
+        audio.play('laser')
+        for _ in range(explosions_per_frame):
+            audio.play('explosion')
+        audio.end_frame()
+    elapsed = perf_counter() - start
+    print(f'{frames} frames, {explosions_per_frame} explosions each, {voices} voices: {audio.report()} '
+          f'({elapsed / frames * 1e6:.1f} us per frame)')
+    return audio.stats
+
+if __name__ == '__main__':
+    stress()
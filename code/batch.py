@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from time import perf_counter
+
+import numpy as np
+
+NEAREST_METEORS = 8  # Meteors described in each observation, closest first
+OBSERVATION_SIZE = 3 + NEAREST_METEORS * 4  # Player x, y and can-shoot, then dx, dy, vx, vy per meteor
+ACTIONS = 32  # An action is a bit set of replay.INPUT_KEYS (left, right, up, down, space)
+TUNABLES = ('SPAWN_INTERVAL', 'METEOR_SPEED', 'LASER_COOLDOWN')  # Game settings a batch may override per game
+
+def observe(game, out):
+    """Write the player and its nearest meteors, scaled to roughly -1..1, into one observation row."""
+    width, height = game.WINDOW_WIDTH, game.WINDOW_HEIGHT
+    player = game.player
+    px, py = player.position
+    out[:] = 0
+    out[0] = px / width
+    out[1] = py / height
+    out[2] = player.can_shoot
+    if game.entity_engine:
+        meteors = game.entity_engine.meteors
+        rows = zip(meteors['x'], meteors['y'], meteors['vx'], meteors['vy'])
+    else:
+        rows = ((m.position.x, m.position.y, m.direction.x * m.speed, m.direction.y * m.speed) for m in game.meteor_sprites)
+    nearest = sorted(((x - px) ** 2 + (y - py) ** 2, x - px, y - py, vx, vy) for x, y, vx, vy in rows)[:NEAREST_METEORS]
+    for slot, (_, dx, dy, vx, vy) in enumerate(nearest):
+        out[3 + slot * 4:7 + slot * 4] = (dx / width, dy / height, vx / width, vy / height)
+
+def worker(index, connection, buffer_names, envs, seed, settings):
+    """Run one headless game in this process, stepping it whenever the batch asks."""
+    os.environ['SPACESHOOTER_HEADLESS'] = '1'
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'  # One banner per worker would drown the report
+    from headless import HeadlessGame
+    from replay import decode_keys
+    import main as game
+
+    for name, value in settings.items():
+        setattr(game, name, value)
+    buffers = [shared_memory.SharedMemory(name=name) for name in buffer_names]
+    observations, rewards, dones, actions = shared_arrays(buffers, envs)
+    observation, episode = observations[index], 0
+    sim = HeadlessGame(seed=seed)
+    observe(game, observation)
+    try:
+        while True:
+            command = connection.recv()
+            if command == 'reset':
+                episode = 0
+                sim.reset(seed)
+                observe(game, observation)
+            elif command == 'step':
+                before = game.score
+                alive = sim.step(decode_keys(int(actions[index])).held)
+                rewards[index] = game.score - before  # Points for surviving the frame
+                dones[index] = not alive
+                if not alive:  # Start the next episode straight away, like a vectorized environment
+                    episode += 1
+                    connection.send(game.score)  # Final score of the finished episode
+                    sim.reset(seed + episode * 100003)
+                    observe(game, observation)
+                    continue
+                observe(game, observation)
+            elif command == 'close':
+                break
+            connection.send(None)
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+def shared_arrays(buffers, envs):
+    """Wrap the shared memory blocks as the observation, reward, done and action arrays."""
+    observations = np.ndarray((envs, OBSERVATION_SIZE), dtype=np.float32, buffer=buffers[0].buf)
+    rewards = np.ndarray(envs, dtype=np.float32, buffer=buffers[1].buf)
+    dones = np.ndarray(envs, dtype=np.bool_, buffer=buffers[2].buf)
+    actions = np.ndarray(envs, dtype=np.uint8, buffer=buffers[3].buf)
+    return observations, rewards, dones, actions
+
+# Many independent headless games, one per process, stepped together through shared-memory arrays
+class BatchEnv:
+    def __init__(self, envs, seed=0, settings=None):
+        unknown = set(settings or ()) - set(TUNABLES)
+        if unknown:
+            raise ValueError(f'not a tunable game setting: {", ".join(sorted(unknown))}')
+        self.envs = envs
+        sizes = (envs * OBSERVATION_SIZE * 4, envs * 4, envs, envs)  # observations, rewards, dones, actions
+        self.buffers = [shared_memory.SharedMemory(create=True, size=size) for size in sizes]
+        self.observations, self.rewards, self.dones, self.actions = shared_arrays(self.buffers, envs)
+        self.finished_scores = []  # Final score of every episode that ended so far
+        self.steps = 0
+        context = multiprocessing.get_context('spawn')  # Fresh interpreters, each game gets its own pygame
+        self.connections = []
+        self.processes = []
+        for index in range(envs):
+            parent, child = context.Pipe()
+            process = context.Process(target=worker, daemon=True,
+                                      args=(index, child, [buffer.name for buffer in self.buffers], envs, seed + index, settings or {}))
+            process.start()
+            child.close()  # Only the worker holds this end now, so recv fails instead of blocking if the worker dies
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def reset(self):
+        """Restart every game; returns the observations (a view of shared memory, overwritten by the next call)."""
+        self.command('reset')
+        return self.observations
+
+    def step(self, actions):
+        """Advance every game one frame with its action; returns (observations, rewards, dones) views of shared memory."""
+        self.actions[:] = actions
+        for final_score in self.command('step'):
+            if final_score is not None:
+                self.finished_scores.append(final_score)
+        self.steps += self.envs
+        return self.observations, self.rewards, self.dones
+
+    def command(self, name):
+        """Send a command to every worker and return their replies; if one died, stop the others, free the shared memory and raise."""
+        try:
+            for connection in self.connections:
+                connection.send(name)
+            return [connection.recv() for connection in self.connections]
+        except (EOFError, OSError):  # EOF once a dead worker's pipe is drained, BrokenPipeError when sending to it
+            self.abort()
+            raise RuntimeError('a batch worker exited unexpectedly') from None
+
+    def abort(self):
+        """Kill every worker without waiting for replies and free the shared memory."""
+        for process in self.processes:
+            process.kill()  # SDL turns SIGTERM into a quit event the worker never reads
+        for process in self.processes:
+            process.join()
+        self.free()
+
+    def free(self):
+        """Close the pipes and release the shared memory blocks, once."""
+        for connection in self.connections:
+            connection.close()
+        for buffer in self.buffers:
+            buffer.close()
+            buffer.unlink()
+        self.connections, self.processes, self.buffers = [], [], []
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        for connection in self.connections:
+            connection.send('close')
+        for process in self.processes:
+            process.join()
+        self.free()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def measure(envs, frames, seed=0, settings=None):
+    """Step `envs` games with random actions for `frames` frames; returns steps per second and the mean episode score."""
+    policy = np.random.default_rng(seed)
+    with BatchEnv(envs, seed, settings) as batch:
+        batch.reset()
+        start = perf_counter()
+        for _ in range(frames):
+            batch.step(policy.integers(0, ACTIONS, envs))
+        elapsed = perf_counter() - start
+        scores = batch.finished_scores
+    return batch.steps / elapsed, sum(scores) / len(scores) if scores else None
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run many headless games in parallel and report aggregate steps per second.')
+    parser.add_argument('--envs', type=int, nargs='+', default=[1, 2, 4, 8], help='numbers of parallel games to measure')
+    parser.add_argument('--frames', type=int, default=2000, help='frames stepped per game')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn-interval', type=float, help='override SPAWN_INTERVAL (seconds)')
+    parser.add_argument('--meteor-speed', type=int, nargs=2, help='override METEOR_SPEED (min max, pixels per second)')
+    parser.add_argument('--cooldown', type=int, help='override LASER_COOLDOWN (milliseconds)')
+    args = parser.parse_args()
+    settings = {name: value for name, value in (('SPAWN_INTERVAL', args.spawn_interval), ('LASER_COOLDOWN', args.cooldown),
+                                                ('METEOR_SPEED', tuple(args.meteor_speed) if args.meteor_speed else None)) if value is not None}
+
+    print(f'{os.cpu_count()} CPU cores')
+    baseline = None
+    for envs in args.envs:
+        rate, mean_score = measure(envs, args.frames, args.seed, settings)
+        baseline = baseline or rate
+        score_text = f'{mean_score:.1f}' if mean_score is not None else 'n/a'
+        print(f'{envs:>4} games: {rate:9.0f} steps/s ({rate / baseline:.2f}x of one game), mean episode score {score_text}')
@@ -0,0 +1,177 @@
+import argparse
+import json
+import platform
+import subprocess
+import tracemalloc
+from statistics import median
+from time import perf_counter
+
+import pygame
+from headless import HeadlessGame
+import main as game
+
+PHASES = ('update', 'collisions', 'draw', 'display')
+KINDS = ('meteors', 'lasers', 'stars', 'explosions')
+COMPARED_SETTINGS = ('render', 'engine', 'render_scale', 'tier')  # Runs are only comparable when these match
+
+def spawn(kind):
+    """Create one entity of the given kind at a random on-screen position."""
+    rng = game.rng
+    pos = (rng.randint(0, game.WINDOW_WIDTH), rng.randint(0, game.WINDOW_HEIGHT))
+    if kind == 'meteors' and game.entity_engine:
+        game.entity_engine.spawn_meteor(pos, rng.uniform(-0.5, 0.5), rng.randint(*game.METEOR_SPEED), rng.randint(40, 80))
+    elif kind == 'meteors':
+        meteor = game.spawn_meteor()
+        meteor.position.update(pos)
+        meteor.rect.center = pos
+    elif kind == 'lasers':
+        game.fire_laser(pos)  # A pooled sprite, or a row in the array engine
+    elif kind == 'stars':
+        game.Star(game.star_sprites, game.star_surf)
+    else:
+        game.explosion_pool.acquire(game.explosion_frames, pos, game.all_sprites)
+
+def members(kind):
+    """Return the live entities of a kind."""
+    if kind == 'meteors':
+        return game.meteor_sprites.sprites()
+    if kind == 'lasers':
+        return game.laser_sprites.sprites()
+    if kind == 'stars':
+        return game.star_sprites.sprites()
+    return [sprite for sprite in game.all_sprites if type(sprite) is game.AnimatedExplosion]
+
+def top_up(target):
+    """Respawn entities that died and trim extra explosions from hits, so the population stays constant."""
+    for kind in KINDS:
+        if game.entity_engine and kind in ('meteors', 'lasers'):
+            top_up_columns(kind, target)
+            continue
+        alive = members(kind)
+        for sprite in alive[target:]:
+            sprite.kill()
+        for _ in range(target - len(alive)):
+            spawn(kind)
+
+def top_up_columns(kind, target):
+    """top_up() for meteors and lasers held by the array engine."""
+    import numpy as np
+    engine = game.entity_engine
+    columns = engine.meteors if kind == 'meteors' else engine.lasers
+    if columns.keep(np.arange(columns.count) < target) and kind == 'meteors':
+        engine.update_frames()
+    for _ in range(target - columns.count):
+        spawn(kind)
+
+def percentile(samples, fraction):
+    """Return the nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_population(population, frames, seed):
+    """Time every frame phase with `population` entities split evenly across the four kinds."""
+    per_kind = max(1, population // len(KINDS))
+    sim = HeadlessGame(seed=seed)
+    game.star_sprites.empty()  # Drop the default starfield, the population below includes its own stars
+
+    tracemalloc.start()  # Only trace the setup and a few frames, tracing would distort the timings
+    top_up(per_kind)
+    game.bake_background()  # Stars never die, so the background only needs baking once
+    for _ in range(5):
+        game.update_entities(sim.dt)
+        game.check_collisions()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = {phase: [] for phase in PHASES}
+    for _ in range(frames):
+        top_up(per_kind)
+        game.game_running = True  # Keep going even if a meteor hits the player
+
+        start = perf_counter()
+        game.update_entities(sim.dt)  # Sprites, and the array engine's columns when it is on
+        after_update = perf_counter()
+        game.check_collisions()
+        after_collisions = perf_counter()
+        dirty_rects = game.draw_game()
+        after_draw = perf_counter()
+        game.present(dirty_rects)
+        after_display = perf_counter()
+
+        timings['update'].append((after_update - start) * 1000)
+        timings['collisions'].append((after_collisions - after_update) * 1000)
+        timings['draw'].append((after_draw - after_collisions) * 1000)
+        timings['display'].append((after_display - after_draw) * 1000)
+
+    frame_totals = [sum(phase_times) for phase_times in zip(*timings.values())]
+    phases = {phase: {'median_ms': median(samples), 'p99_ms': percentile(samples, 0.99)} for phase, samples in timings.items()}
+    phases['frame'] = {'median_ms': median(frame_totals), 'p99_ms': percentile(frame_totals, 0.99)}
+    return {'population': population, 'frames': frames, 'peak_memory_bytes': peak_memory, 'phases': phases, 'pools': game.pool_stats()}
+
+def git_revision():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def setup_differences(results, baseline):
+    """Return the settings that change what is timed (render path, engine, scale, tier) and differ between two runs."""
+    return [f'{key} {baseline.get(key)} -> {results[key]}' for key in COMPARED_SETTINGS if baseline.get(key) != results[key]]
+
+def compare(results, baseline, threshold):
+    """Print per-phase median changes against a previous run and return True if any phase regressed."""
+    regressed = False
+    previous = {run['population']: run for run in baseline['runs']}
+    for run in results['runs']:
+        old_run = previous.get(run['population'])
+        if not old_run:
+            continue
+        for phase, stats in run['phases'].items():
+            old = old_run['phases'].get(phase)
+            if not old or not old['median_ms']:
+                continue
+            change = stats['median_ms'] / old['median_ms'] - 1
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressed = True
+            print(f"{run['population']:>7} {phase:<11} {old['median_ms']:8.3f} -> {stats['median_ms']:8.3f} ms ({change:+.1%}){flag}")
+    return regressed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark per-phase frame cost at increasing entity counts.')
+    parser.add_argument('--populations', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--frames', type=int, default=120, help='timed frames per population')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--render', choices=('dirty', 'full'), default=game.RENDER_MODE, help='rendering path to time')
+    parser.add_argument('--tier', type=int, default=0, help='quality governor tier to hold (0 is full quality)')
+    parser.add_argument('--output', default='bench.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='median slowdown that counts as a regression')
+    args = parser.parse_args()
+    game.RENDER_MODE = args.render
+    game.governor = None  # Hold the requested tier, the benchmark must not adapt itself
+    game.apply_quality(args.tier)
+
+    results = {'revision': git_revision(), 'render': args.render, 'engine': game.ENTITY_ENGINE, 'tier': args.tier, 'render_scale': game.RENDER_SCALE, 'python': platform.python_version(), 'pygame': pygame.version.ver, 'runs': []}
+    print(f"{'entities':>8} {'phase':<11} {'median ms':>10} {'p99 ms':>8}")
+    for population in args.populations:
+        run = run_population(population, args.frames, args.seed)
+        results['runs'].append(run)
+        for phase, stats in run['phases'].items():
+            print(f"{population:>8} {phase:<11} {stats['median_ms']:>10.3f} {stats['p99_ms']:>8.3f}")
+        print(f"{population:>8} peak memory {run['peak_memory_bytes'] / 1024 / 1024:.1f} MiB")
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        differences = setup_differences(results, baseline)
+        if differences:
+            raise SystemExit(f'not comparing against {args.baseline}, it was run with other settings: {", ".join(differences)}')
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
@@ -0,0 +1,242 @@
+import pygame
+from math import hypot
+from os.path import join
+from random import Random
+from time import perf_counter
+
+# Spatial hash (uniform grid) broadphase used by check_collisions
+class SpatialHash:
+    def __init__(self, width, height, cell_size=128):
+        self.cell_size = cell_size  # Size of one square grid cell in pixels
+        self.max_column = (width - 1) // cell_size  # Last column inside the playfield
+        self.max_row = (height - 1) // cell_size  # Last row inside the playfield
+        self.cells = {}  # (column, row) -> sprites overlapping that cell
+        self.order = {}  # sprite -> insertion order, so queries return sprites in group order
+
+    def cell_range(self, rect):
+        """Return the clamped column and row span covered by a rect."""
+        size = self.cell_size
+        left = min(max(rect.left // size, 0), self.max_column)  # Sprites outside the playfield land in edge cells
+        right = min(max((rect.right - 1) // size, 0), self.max_column)
+        top = min(max(rect.top // size, 0), self.max_row)
+        bottom = min(max((rect.bottom - 1) // size, 0), self.max_row)
+        return left, right, top, bottom
+
+    def insert(self, sprite):
+        """Add a sprite to every cell its rect overlaps."""
+        self.order[sprite] = len(self.order)
+        left, right, top, bottom = self.cell_range(sprite.rect)
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                cell = self.cells.get((column, row))
+                if cell is None:
+                    self.cells[(column, row)] = [sprite]
+                else:
+                    cell.append(sprite)
+
+    def rebuild(self, sprites):
+        """Clear the grid and re-insert all sprites from their current rects."""
+        self.cells.clear()
+        self.order.clear()
+        for sprite in sprites:
+            self.insert(sprite)
+
+    def query(self, rect):
+        """Return the sprites sharing at least one cell with the rect, in insertion order."""
+        left, right, top, bottom = self.cell_range(rect)
+        if left == right and top == bottom:  # Common case: a small rect inside one cell
+            return self.cells.get((left, top), [])
+        found = set()
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                found.update(self.cells.get((column, row), ()))
+        return sorted(found, key=self.order.__getitem__)
+
+def grid_spritecollide(sprite, grid, group, dokill, collided=None):
+    """Grid-backed version of pygame.sprite.spritecollide that only tests sprites from nearby cells."""
+    hits = []
+    for other in grid.query(sprite.rect):
+        if other not in group:  # Already killed earlier this frame
+            continue
+        if collided(sprite, other) if collided else sprite.rect.colliderect(other.rect):
+            hits.append(other)
+            if dokill:
+                other.kill()
+    return hits
+
+def bounding_radius(mask):
+    """Return the distance from a mask's centre to the farthest corner of its set pixels."""
+    center_x, center_y = mask.get_size()[0] // 2, mask.get_size()[1] // 2  # Same centre as Rect.center
+    radius = 0
+    for rect in mask.get_bounding_rects():
+        for x in (rect.left, rect.right):
+            for y in (rect.top, rect.bottom):
+                radius = max(radius, hypot(x - center_x, y - center_y))
+    return radius
+
+# Masks and radii are shared by every sprite using the same surface
+shape_cache = {}
+
+def surface_shape(surf, radius=None):
+    """Return the cached (mask, bounding radius) pair for a surface, building it on first use (a known radius is not measured again)."""
+    shape = shape_cache.get(surf)
+    if shape is None:
+        mask = pygame.mask.from_surface(surf)
+        shape = shape_cache[surf] = (mask, bounding_radius(mask) if radius is None else radius)
+    return shape
+
+# Layered narrowphase: rect reject -> circle reject -> mask overlap
+class TieredCollider:
+    def __init__(self, counting=False):
+        self.counting = counting  # Count which tier settled each pair; costs time, so only for profiling and reports
+        self.stats = {'rect_reject': 0, 'circle_reject': 0, 'mask_reject': 0, 'mask_hit': 0}
+
+    def __call__(self, left, right):
+        """Collide two sprites that carry rect, radius and mask, in the same way as collide_mask."""
+        if self.counting:
+            return self.counted(left, right)
+        left_rect, right_rect = left.rect, right.rect
+        if not left_rect.colliderect(right_rect):  # One C call settles most broadphase candidates
+            return False
+        dx = left_rect.centerx - right_rect.centerx
+        dy = left_rect.centery - right_rect.centery
+        reach = left.radius + right.radius
+        if dx * dx + dy * dy > reach * reach:  # Overlapping corners of two round shapes
+            return False
+        return left.mask.overlap(right.mask, (right_rect.x - left_rect.x, right_rect.y - left_rect.y)) is not None
+
+    def counted(self, left, right):
+        """Same test as __call__, counting the tier that settled it."""
+        stats = self.stats
+        left_rect, right_rect = left.rect, right.rect
+        if not left_rect.colliderect(right_rect):
+            stats['rect_reject'] += 1
+            return False
+        dx = left_rect.centerx - right_rect.centerx
+        dy = left_rect.centery - right_rect.centery
+        reach = left.radius + right.radius
+        if dx * dx + dy * dy > reach * reach:
+            stats['circle_reject'] += 1
+            return False
+        if left.mask.overlap(right.mask, (right_rect.x - left_rect.x, right_rect.y - left_rect.y)):
+            stats['mask_hit'] += 1
+            return True
+        stats['mask_reject'] += 1
+        return False
+
+    def reset_stats(self):
+        """Zero all tier counters."""
+        for tier in self.stats:
+            self.stats[tier] = 0
+
+    def report(self):
+        """Return a one-line summary of how many pairs each tier settled."""
+        total = sum(self.stats.values())
+        mask_tests = self.stats['mask_reject'] + self.stats['mask_hit']
+        tiers = ', '.join(f'{tier}={count}' for tier, count in self.stats.items())
+        return f'{total} pairs: {tiers} ({total - mask_tests} mask tests avoided)'
+
+def stress(counts=(100, 1000, 5000), queries=200, rounds=5, seed=1):
+    """Time naive spritecollide against the grid broadphase as the number of targets grows."""
+    rng = Random(seed)
+    print(f"{'targets':>8} {'naive ms':>10} {'rebuild ms':>11} {'query ms':>10}")
+    for count in counts:
+        targets = pygame.sprite.Group()
+        for _ in range(count):
+            target = pygame.sprite.Sprite(targets)
+            target.rect = pygame.Rect(rng.randint(0, 1600), rng.randint(-100, 900), 101, 84)
+        probes = []
+        for _ in range(queries):
+            probe = pygame.sprite.Sprite()
+            probe.rect = pygame.Rect(rng.randint(0, 1600), rng.randint(0, 900), 9, 54)
+            probes.append(probe)
+
+        naive_time = rebuild_time = query_time = 0
+        grid = SpatialHash(1600, 900)
+        for _ in range(rounds):
+            start = perf_counter()
+            naive_hits = [pygame.sprite.spritecollide(probe, targets, False) for probe in probes]
+            naive_time += perf_counter() - start
+
+            start = perf_counter()
+            grid.rebuild(targets)  # Rebuild cost is part of the per-frame price
+            rebuild_time += perf_counter() - start
+
+            start = perf_counter()
+            grid_hits = [grid_spritecollide(probe, grid, targets, False) for probe in probes]
+            query_time += perf_counter() - start
+
+            assert naive_hits == grid_hits, 'grid broadphase disagrees with spritecollide'
+        print(f'{count:>8} {naive_time * 1000 / rounds:>10.2f} {rebuild_time * 1000 / rounds:>11.2f} {query_time * 1000 / rounds:>10.2f}')
+
+def narrowphase_stress(pairs=20000, seed=1):
+    """Compare collide_mask with TieredCollider on random laser/meteor pairs near each other."""
+    rng = Random(seed)
+    meteor_image = pygame.image.load(join('images', 'meteor.png'))
+    laser_image = pygame.image.load(join('images', 'laser.png'))
+    sprites = []
+    for image in (meteor_image, laser_image):
+        sprite = pygame.sprite.Sprite()
+        sprite.image = image
+        sprite.mask, sprite.radius = surface_shape(image)
+        sprite.rect = image.get_rect()
+        sprites.append(sprite)
+    meteor, laser = sprites
+
+    offsets = [(rng.randint(-120, 120), rng.randint(-120, 120)) for _ in range(pairs)]  # Broadphase-sized neighbourhood
+    collider = TieredCollider()
+    counter = TieredCollider(counting=True)
+    mask_time = tiered_time = 0
+    for dx, dy in offsets:
+        laser.rect.center = (meteor.rect.centerx + dx, meteor.rect.centery + dy)
+        start = perf_counter()
+        expected = bool(pygame.sprite.collide_mask(laser, meteor))
+        mask_time += perf_counter() - start
+        start = perf_counter()
+        result = collider(laser, meteor)
+        tiered_time += perf_counter() - start
+        assert expected == result == counter(laser, meteor), 'tiered narrowphase disagrees with collide_mask'
+    print(f'collide_mask {mask_time * 1000:.2f} ms, tiered {tiered_time * 1000:.2f} ms')
+    print(counter.report())
+
+def check_collisions_timing(meteors=400, lasers=400, frames=60, seed=1):
+    """Time the game's check_collisions with collide_mask against the tiered collider on the same crowded frames."""
+    from statistics import median
+    import headless
+    import main as game
+
+    if game.entity_engine:
+        raise SystemExit('check_collisions_timing measures the sprite path, run it without SPACESHOOTER_ENGINE=arrays')
+    sim = headless.HeadlessGame(seed=seed)
+    game.player.position.update(-1000, -1000)  # Out of the way, the round must not end
+    game.player.rect.center = game.player.position
+    colliders = {'collide_mask': pygame.sprite.collide_mask, 'tiered': TieredCollider()}
+    timings = {name: [] for name in colliders}
+    kills = {name: 0 for name in colliders}
+    for frame in range(frames):
+        for name, collider in colliders.items():
+            rng = Random(seed * 100003 + frame)  # Same layout for both colliders
+            for _ in range(meteors):
+                meteor = game.spawn_meteor()
+                meteor.position.update(rng.randint(0, game.WINDOW_WIDTH), rng.randint(0, game.WINDOW_HEIGHT))
+                meteor.rect.center = meteor.position
+            for _ in range(lasers):
+                game.fire_laser((rng.randint(0, game.WINDOW_WIDTH), rng.randint(0, game.WINDOW_HEIGHT)))
+            before = len(game.meteor_sprites)
+            game.narrowphase = collider
+            start = perf_counter()
+            game.check_collisions()
+            timings[name].append((perf_counter() - start) * 1000)
+            kills[name] += before - len(game.meteor_sprites)
+            for sprite in game.all_sprites.sprites():
+                if sprite is not game.player:
+                    sprite.kill()
+    game.narrowphase = TieredCollider()
+    assert kills['collide_mask'] == kills['tiered'], 'tiered narrowphase destroyed other meteors than collide_mask'
+    print(f'check_collisions, {meteors} meteors and {lasers} lasers: ' +
+          ', '.join(f'{name} {median(samples):.2f} ms' for name, samples in timings.items()))
+
+if __name__ == '__main__':
+    stress()
+    narrowphase_stress()
+    check_collisions_timing()
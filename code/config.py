@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+
+# Every setting and its default. Each one can be set in the settings file, by a SPACESHOOTER_<NAME> environment
+# variable or on the command line (--name); later sources win.
+DEFAULTS = {
+    'window_width': 1600,  # Window size; with upscale 'scaled' SDL sizes the window to a whole multiple of the render size instead
+    'window_height': 900,
+    'render_scale': 1.0,  # Frames are drawn at the playfield size times this and upscaled to the window
+    'upscale': 'scaled',  # 'scaled': pygame.SCALED lets SDL upscale on the GPU, 'smooth': transform.smoothscale on the CPU
+    'render': 'dirty',  # 'dirty' repaints only what changed, 'full' redraws the whole frame
+    'engine': 'sprites',  # 'arrays' moves, collides and draws meteors and lasers with NumPy
+    'fps': -1,  # Frame rate cap while playing: -1 for the display's refresh rate, 0 for uncapped (uses a whole core)
+    'max_steps': 8,  # Most fixed simulation steps one frame may run
+    'governor': True,  # Drop detail when frames go over budget
+    'profile': False,  # Start with the frame profiler on (F3 toggles it)
+    'trace': 'profile_trace.json',  # Where the profiler writes its trace on exit
+    'record': '',  # Folder to save input recordings of every round to, empty for none
+    'leaderboard': 'highscores.log',  # Log file of every finished round's score, empty for no high scores
+    'rewind': 0,  # Seconds of play kept for rewinding (hold Backspace), 0 (the default) turns it off; a debugging aid
+}
+CHOICES = {'upscale': ('scaled', 'smooth'), 'render': ('dirty', 'full'), 'engine': ('sprites', 'arrays')}
+SETTINGS_FILE = 'settings.json'
+
+def parse_value(name, value):
+    """Convert a setting from text (or JSON) to the type of its default."""
+    kind = type(DEFAULTS[name])
+    if kind is bool and isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return kind(value)
+
+def load_settings(argv=(), path=None):
+    """Return the settings from the defaults, the settings file, the environment and argv, in that order."""
+    parser = argparse.ArgumentParser(description='Space Shooter')
+    parser.add_argument('--config', help=f'settings file (default {SETTINGS_FILE}, or SPACESHOOTER_CONFIG)')
+    for name, default in DEFAULTS.items():
+        parser.add_argument('--' + name.replace('_', '-'), dest=name, choices=CHOICES.get(name),
+                            type=str if type(default) is bool else type(default))
+    args = parser.parse_args(argv)
+
+    settings = dict(DEFAULTS)
+    path = args.config or path or os.environ.get('SPACESHOOTER_CONFIG', SETTINGS_FILE)
+    if os.path.exists(path):
+        with open(path) as file:
+            for name, value in json.load(file).items():
+                if name not in DEFAULTS:
+                    raise ValueError(f'{path}: unknown setting {name!r}')
+                settings[name] = parse_value(name, value)
+    for name in DEFAULTS:
+        value = os.environ.get('SPACESHOOTER_' + name.upper())
+        if value is not None:
+            settings[name] = parse_value(name, value)
+    for name in DEFAULTS:
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = parse_value(name, value)
+
+    for name, choices in CHOICES.items():
+        if settings[name] not in choices:
+            raise ValueError(f'{name} must be one of {", ".join(choices)}, not {settings[name]!r}')
+    if not 0 < settings['render_scale'] <= 4:
+        raise ValueError('render_scale must be above 0 and at most 4')
+    return settings
@@ -0,0 +1,320 @@
+import os
+from itertools import repeat
+
+try:
+    import numpy as np
+except ImportError:  # The array engine is optional, the sprite path does not need NumPy
+    np = None
+
+LASER_SPEED = 400  # Same speed as Laser.update
+
+# Float columns of a set of entities, stored as rows of one 2D array with a live count
+class Columns:
+    def __init__(self, names, capacity=256):
+        self.index = {name: row for row, name in enumerate(names)}
+        self.data = np.zeros((len(names), capacity))
+        self.count = 0
+
+    def __getitem__(self, name):
+        """Return a view of one column for the live entities."""
+        return self.data[self.index[name], :self.count]
+
+    def __setitem__(self, name, values):
+        self.data[self.index[name], :self.count] = values
+
+    def append(self, *values):
+        """Add one entity, doubling the capacity when the arrays are full."""
+        if self.count == self.data.shape[1]:
+            grown = np.zeros((self.data.shape[0], self.count * 2))
+            grown[:, :self.count] = self.data
+            self.data = grown
+        self.data[:, self.count] = values
+        self.count += 1
+
+    def keep(self, mask):
+        """Drop every entity whose entry in the boolean mask is False, keeping the order of the rest; True if any went."""
+        kept = int(mask.sum())
+        if kept == self.count:
+            return False
+        self.data[:, :kept] = self.data[:, :self.count][:, mask]
+        self.count = kept
+        return True
+
+    def clear(self):
+        self.count = 0
+
+    def load(self, values):
+        """Replace every entity with the columns of a (columns, count) array."""
+        count = values.shape[1]
+        if count > self.data.shape[1]:
+            self.data = np.zeros((self.data.shape[0], count * 2))
+        self.data[:, :count] = values
+        self.count = count
+
+# Meteors and lasers as NumPy arrays, moved, culled, collided and drawn in bulk instead of one sprite at a time
+class EntityEngine:
+    def __init__(self, meteor_frames, laser_surf, laser_mask, laser_radius, window_height):
+        if np is None:
+            raise ImportError('the array entity engine needs NumPy')
+        self.frame_surfs = [frame[0] for frame in meteor_frames]  # Pre-rotated meteor images
+        self.frame_masks = [frame[1] for frame in meteor_frames]
+        self.frame_radii = np.array([frame[2] for frame in meteor_frames])
+        self.frame_sizes = np.array([surf.get_size() for surf in self.frame_surfs], dtype=np.intp)
+        self.max_meteor_radius = float(self.frame_radii.max())
+        self.laser_surf = laser_surf
+        self.laser_mask = laser_mask
+        self.laser_radius = laser_radius
+        self.laser_size = laser_surf.get_size()
+        self.window_height = window_height
+        self.meteors = Columns(('x', 'y', 'px', 'py', 'vx', 'vy', 'rotation', 'rotation_speed'))  # Centres, previous centres, velocity, spin
+        self.lasers = Columns(('x', 'y', 'px', 'py'))  # Centres, previous centres
+        self.frame_buffer = np.zeros(256, dtype=np.intp)  # Rotation frame of every meteor, grown like Columns (see meteor_frame)
+        self.rotate = True  # False freezes every meteor on its current rotation frame (quality governor)
+        self.render_scale = 1  # Drawing scale from playfield to render coordinates, see set_render_scale()
+        self.draw_surfs, self.draw_sizes = self.frame_surfs, self.frame_sizes
+        self.draw_laser, self.draw_laser_size = laser_surf, self.laser_size
+
+    @property
+    def meteor_frame(self):
+        """Rotation frame of every live meteor (a view of frame_buffer)."""
+        return self.frame_buffer[:self.meteors.count]
+
+    @meteor_frame.setter
+    def meteor_frame(self, frames):
+        if len(frames) > len(self.frame_buffer):
+            self.frame_buffer = np.zeros(len(frames) * 2, dtype=np.intp)
+        self.frame_buffer[:len(frames)] = frames
+
+    def clear(self):
+        self.meteors.clear()
+        self.lasers.clear()
+
+    def save(self):
+        """Return the live meteors and lasers as raw bytes for load()."""
+        return b''.join((self.meteors.data[:, :self.meteors.count].tobytes(), self.lasers.data[:, :self.lasers.count].tobytes(),
+                         self.meteor_frame.astype(np.int64).tobytes()))
+
+    def load(self, data, meteor_count, laser_count):
+        """Replace every meteor and laser with the ones saved by save()."""
+        meteor_values = meteor_count * len(self.meteors.index)
+        laser_values = laser_count * len(self.lasers.index)
+        values = np.frombuffer(data, dtype=np.float64, count=meteor_values + laser_values)
+        self.meteors.load(values[:meteor_values].reshape(len(self.meteors.index), meteor_count))
+        self.lasers.load(values[meteor_values:].reshape(len(self.lasers.index), laser_count))
+        self.meteor_frame = np.frombuffer(data, dtype=np.int64, count=meteor_count, offset=values.nbytes).astype(np.intp)
+
+    def spawn_meteor(self, pos, direction_x, speed, rotation_speed):
+        """Add a meteor centred at pos, moving like Meteor (direction (direction_x, 1) times speed)."""
+        self.meteors.append(pos[0], pos[1], pos[0], pos[1], direction_x * speed, speed, 0, rotation_speed)
+        count = self.meteors.count
+        if count > len(self.frame_buffer):  # Doubles like Columns.append, so spawning stays linear
+            grown = np.zeros(count * 2, dtype=np.intp)
+            grown[:count - 1] = self.frame_buffer[:count - 1]
+            self.frame_buffer = grown
+        self.frame_buffer[count - 1] = 0
+
+    def spawn_laser(self, midbottom):
+        """Add a laser whose bottom edge is centred at midbottom, like Laser."""
+        y = midbottom[1] - self.laser_size[1] / 2
+        self.lasers.append(midbottom[0], y, midbottom[0], y)
+
+    def update_frames(self):
+        """Recompute each meteor's rotation frame from its angle."""
+        steps = len(self.frame_surfs)
+        self.meteor_frame = (self.meteors['rotation'] * (steps / 360)).astype(np.intp) % steps
+
+    def step(self, dt):
+        """Move every meteor and laser and remove the ones that left the screen."""
+        meteors = self.meteors
+        meteors['px'] = meteors['x']  # Kept for interpolated drawing
+        meteors['py'] = meteors['y']
+        meteors['x'] += meteors['vx'] * dt
+        meteors['y'] += meteors['vy'] * dt
+        if self.rotate:
+            meteors['rotation'] += meteors['rotation_speed'] * dt
+            self.update_frames()
+        if meteors.keep(meteors['y'] - self.frame_sizes[self.meteor_frame, 1] / 2 <= self.window_height):  # rect.top > WINDOW_HEIGHT
+            self.update_frames()
+
+        lasers = self.lasers
+        lasers['px'] = lasers['x']
+        lasers['py'] = lasers['y']
+        lasers['y'] -= LASER_SPEED * dt
+        lasers.keep(lasers['y'] + self.laser_size[1] / 2 >= 0)  # rect.bottom < 0
+
+    def meteor_topleft(self, index):
+        """Integer top-left corner of a meteor's current frame, as its sprite rect would have it."""
+        width, height = self.frame_sizes[self.meteor_frame[index]]
+        return int(self.meteors['x'][index]) - width // 2, int(self.meteors['y'][index]) - height // 2
+
+    def meteor_hits(self, index, mask, topleft):
+        """Pixel-perfect test of one meteor against another mask placed at topleft."""
+        left, top = self.meteor_topleft(index)
+        return mask.overlap(self.frame_masks[self.meteor_frame[index]], (left - topleft[0], top - topleft[1]))
+
+    def collide(self, player):
+        """Resolve player and laser hits; returns (player_hit, centres of the meteors the lasers destroyed)."""
+        meteors, lasers = self.meteors, self.lasers
+        if not meteors.count:
+            return False, []
+        x, y = meteors['x'], meteors['y']
+        radii = self.frame_radii[self.meteor_frame]
+
+        # Player: one vectorized circle test, then masks for the few meteors that are close
+        dx = x - player.rect.centerx
+        dy = y - player.rect.centery
+        reach = radii + player.radius
+        close = np.nonzero(dx * dx + dy * dy <= reach * reach)[0]
+        player_hits = [index for index in close if self.meteor_hits(index, player.mask, player.rect.topleft)]
+        if player_hits:
+            alive = np.ones(meteors.count, dtype=bool)
+            alive[player_hits] = False
+            meteors.keep(alive)
+            self.update_frames()
+            return True, []
+        if not lasers.count:
+            return False, []
+
+        # Lasers: sweep over meteors sorted by x to find the pairs that can touch
+        order = np.argsort(x, kind='stable')
+        sorted_x = x[order]
+        sweep = self.max_meteor_radius + self.laser_radius
+        laser_x, laser_y = lasers['x'], lasers['y']
+        first = np.searchsorted(sorted_x, laser_x - sweep, 'left')
+        last = np.searchsorted(sorted_x, laser_x + sweep, 'right')
+        counts = last - first
+        pair_laser = np.repeat(np.arange(lasers.count), counts)
+        starts = np.repeat(first - (np.cumsum(counts) - counts), counts)
+        pair_meteor = order[np.arange(counts.sum()) + starts]
+        dx = laser_x[pair_laser] - x[pair_meteor]
+        dy = laser_y[pair_laser] - y[pair_meteor]
+        reach = radii[pair_meteor] + self.laser_radius
+        near = dx * dx + dy * dy <= reach * reach
+        pair_laser, pair_meteor = pair_laser[near], pair_meteor[near]
+        pair_order = np.lexsort((pair_meteor, pair_laser))  # Same order as looping lasers, then meteors, like the sprite path
+
+        laser_alive = np.ones(lasers.count, dtype=bool)
+        meteor_alive = np.ones(meteors.count, dtype=bool)
+        destroyed = []
+        laser_width, laser_height = self.laser_size
+        for laser, meteor in zip(pair_laser[pair_order].tolist(), pair_meteor[pair_order].tolist()):
+            if not meteor_alive[meteor]:
+                continue
+            laser_topleft = (int(laser_x[laser]) - laser_width // 2, int(laser_y[laser]) - laser_height // 2)
+            if self.meteor_hits(meteor, self.laser_mask, laser_topleft):
+                laser_alive[laser] = False
+                meteor_alive[meteor] = False
+                destroyed.append((int(x[meteor]), int(y[meteor])))
+        if destroyed:
+            lasers.keep(laser_alive)
+            meteors.keep(meteor_alive)
+            self.update_frames()
+        return False, destroyed
+
+    def interpolated(self, columns, alpha):
+        """Return the x and y drawing positions between the previous (alpha 0) and current (alpha 1) step."""
+        if alpha >= 1:
+            return columns['x'], columns['y']
+        return columns['px'] + (columns['x'] - columns['px']) * alpha, columns['py'] + (columns['y'] - columns['py']) * alpha
+
+    def set_render_scale(self, scale, scale_image):
+        """Draw at `scale` times playfield coordinates, with images resized by scale_image(surface); collisions are unaffected."""
+        self.render_scale = scale
+        self.draw_surfs = [scale_image(surf) for surf in self.frame_surfs]
+        self.draw_sizes = np.array([surf.get_size() for surf in self.draw_surfs], dtype=np.intp)
+        self.draw_laser = scale_image(self.laser_surf)
+        self.draw_laser_size = self.draw_laser.get_size()
+
+    def draw(self, surface, alpha=1.0):
+        """Blit all meteors and lasers, interpolated by alpha, with one batched call each."""
+        blit_many = getattr(surface, 'fblits', None) or surface.blits
+        scale = self.render_scale
+        if self.meteors.count:
+            sizes = self.draw_sizes[self.meteor_frame]
+            x, y = self.interpolated(self.meteors, alpha)
+            if scale != 1:
+                x, y = x * scale, y * scale
+            lefts = (x.astype(np.intp) - sizes[:, 0] // 2).tolist()
+            tops = (y.astype(np.intp) - sizes[:, 1] // 2).tolist()
+            draw_surfs = self.draw_surfs
+            blit_many([(draw_surfs[frame], position) for frame, position in zip(self.meteor_frame.tolist(), zip(lefts, tops))])
+        if self.lasers.count:
+            laser_width, laser_height = self.draw_laser_size
+            x, y = self.interpolated(self.lasers, alpha)
+            if scale != 1:
+                x, y = x * scale, y * scale
+            lefts = (x.astype(np.intp) - laser_width // 2).tolist()
+            tops = (y.astype(np.intp) - laser_height // 2).tolist()
+            blit_many(list(zip(repeat(self.draw_laser), zip(lefts, tops))))
+
+def compare(count, frames=60, seed=0):
+    """Time update, collisions and drawing for `count` meteors plus lasers, sprite path against the array engine."""
+    from statistics import median
+    from time import perf_counter
+    from headless import HeadlessGame
+    import main as game
+
+    results = {}
+    for path in ('sprites', 'arrays'):
+        sim = HeadlessGame(seed=seed)
+        sim.player.rect.center = (-1000, -1000)  # Keep the player out of the way, only meteors and lasers are measured
+        engine = EntityEngine(game.meteor_frames, game.laser_surf, *game.surface_shape(game.laser_surf), game.WINDOW_HEIGHT)
+        rng = game.rng
+        timings = {'update': [], 'collisions': [], 'draw': []}
+        for _ in range(frames):
+            # Top both populations back up outside the timed part
+            meteor_count = engine.meteors.count if path == 'arrays' else len(game.meteor_sprites)
+            laser_count = engine.lasers.count if path == 'arrays' else len(game.laser_sprites)
+            for _ in range(count // 2 - meteor_count):
+                pos = (rng.randint(0, game.WINDOW_WIDTH), rng.randint(0, game.WINDOW_HEIGHT))
+                if path == 'arrays':
+                    engine.spawn_meteor(pos, rng.uniform(-0.5, 0.5), rng.randint(400, 500), rng.randint(40, 80))
+                else:
+                    meteor = game.spawn_meteor()
+                    meteor.position.update(pos)
+                    meteor.rect.center = pos
+            for _ in range(count // 2 - laser_count):
+                pos = (rng.randint(0, game.WINDOW_WIDTH), rng.randint(0, game.WINDOW_HEIGHT))
+                if path == 'arrays':
+                    engine.spawn_laser(pos)
+                else:
+                    game.laser_pool.acquire(game.laser_surf, pos, (game.all_sprites, game.laser_sprites))
+
+            start = perf_counter()
+            if path == 'arrays':
+                engine.step(sim.dt)
+            else:
+                game.meteor_sprites.update(sim.dt)
+                game.laser_sprites.update(sim.dt)
+            after_update = perf_counter()
+            if path == 'arrays':
+                for center in engine.collide(sim.player)[1]:
+                    game.explosion_pool.acquire(game.explosion_frames, center, game.all_sprites)  # As check_collisions does
+            else:
+                game.check_collisions()
+            after_collisions = perf_counter()
+            if path == 'arrays':
+                engine.draw(game.display_surface)
+            else:
+                game.meteor_sprites.draw(game.display_surface)
+                game.laser_sprites.draw(game.display_surface)
+            after_draw = perf_counter()
+            for sprite in game.all_sprites.sprites():
+                if isinstance(sprite, game.AnimatedExplosion):
+                    sprite.kill()  # Explosions are not part of the comparison
+
+            timings['update'].append((after_update - start) * 1000)
+            timings['collisions'].append((after_collisions - after_update) * 1000)
+            timings['draw'].append((after_draw - after_collisions) * 1000)
+        results[path] = {phase: median(samples) for phase, samples in timings.items()}
+        game.clear_game_objects()
+    return results
+
+if __name__ == '__main__':
+    os.environ['SPACESHOOTER_HEADLESS'] = '1'
+    for count, frames in ((1000, 60), (10000, 20)):
+        results = compare(count, frames)
+        print(f'{count} meteors + lasers (median ms per frame)')
+        for phase in ('update', 'collisions', 'draw'):
+            sprites, arrays = results['sprites'][phase], results['arrays'][phase]
+            print(f'  {phase:<11} sprites {sprites:8.3f}  arrays {arrays:8.3f}  ({sprites / arrays:.1f}x)')
@@ -0,0 +1,64 @@
+from collections import deque
+
+import pygame
+
+# Quality tiers, from full quality down; each tier also keeps every cut of the tiers above it
+TIERS = ('full', 'frozen rotation', 'skipped explosion frames', 'capped explosions', 'no starfield')
+QUALITY_EVENT = pygame.event.custom_type()  # Posted on every tier change, with tier, previous and frame_ms
+
+# Watches frame time against a budget and steps quality down when over it, back up when there is headroom
+class QualityGovernor:
+    def __init__(self, budget_ms=1000 / 60, window=30, headroom=0.7, recover_frames=120):
+        self.budget_ms = budget_ms  # Frame time the game should stay under
+        self.window = window  # Frames averaged before stepping down
+        self.headroom = headroom  # Fraction of the budget the average must stay under to step back up
+        self.recover_frames = recover_frames  # Frames of headroom needed before stepping up (longer, so it does not flicker)
+        self.tier = 0
+        self.samples = deque(maxlen=recover_frames)  # Frame times since the last change
+        self.frames_in_tier = [0] * len(TIERS)
+        self.downgrades = [0] * len(TIERS)  # Times each tier was entered from above
+        self.upgrades = [0] * len(TIERS)  # Times each tier was entered from below
+
+    def record(self, frame_ms):
+        """Add one frame's time; returns True if the tier changed."""
+        self.frames_in_tier[self.tier] += 1
+        samples = self.samples
+        samples.append(frame_ms)
+        if len(samples) >= self.window and self.tier < len(TIERS) - 1:
+            recent = sum(samples[index] for index in range(len(samples) - self.window, len(samples))) / self.window
+            if recent > self.budget_ms:
+                return self.change(self.tier + 1, recent)
+        if len(samples) == self.recover_frames and self.tier > 0:
+            average = sum(samples) / len(samples)
+            if average < self.budget_ms * self.headroom:
+                return self.change(self.tier - 1, average)
+        return False
+
+    def change(self, tier, frame_ms):
+        """Switch to another tier, count it and post a QUALITY_EVENT."""
+        previous = self.tier
+        self.tier = tier
+        (self.downgrades if tier > previous else self.upgrades)[tier] += 1
+        self.samples.clear()  # Judge the new tier on its own frames
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(QUALITY_EVENT, tier=tier, previous=previous, frame_ms=frame_ms))
+        return True
+
+    def reset(self, tier=0):
+        """Carry on from a tier (full quality for a new round, the saved one after a restore), keeping the counters."""
+        self.tier = tier
+        self.samples.clear()
+
+    def report(self):
+        """Return one line per tier with the frames spent in it and how often it was entered."""
+        return '\n'.join(f'{index} {name:<25} {frames:>8} frames, entered {down} times from above and {up} from below'
+                         for index, (name, frames, down, up) in enumerate(zip(TIERS, self.frames_in_tier, self.downgrades, self.upgrades)))
+
+if __name__ == '__main__':
+    # Feed a synthetic load: calm, a long spike that needs several tiers, then calm again
+    governor = QualityGovernor()
+    load = [8] * 300 + [30] * 200 + [20] * 200 + [9] * 900
+    for frame, frame_ms in enumerate(load):
+        if governor.record(frame_ms):
+            print(f'frame {frame:>5}: {frame_ms:4.1f} ms -> tier {governor.tier} ({TIERS[governor.tier]})')
+    print(governor.report())
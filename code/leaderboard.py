@@ -0,0 +1,150 @@
+import json
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+# High scores: every finished round is appended to a log file as one compact JSON line, the best `size` rounds are
+# kept sorted in memory for the game over screen, and all file work happens on one background thread
+class Leaderboard:
+    def __init__(self, path, size=10, compact_every=500):
+        self.path = path
+        self.size = size  # Entries kept in memory and after compaction
+        self.compact_every = compact_every  # Log lines beyond the top entries before the log is rewritten with just those
+        self.keys = []  # (-score, order) of every top entry, best first; order breaks ties in favour of the earlier round
+        self.entries = []  # (score, ship, time) in the same order as keys
+        self.order = 0  # Number of rounds seen, also the order of the next one
+        self.log_lines = 0  # Lines in the log file, including the ones still queued for the writer
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='leaderboard')  # One worker: writes stay in order
+        self.file = None  # Log file opened for appending by the writer thread
+        self.stats = {'submitted': 0, 'written': 0, 'compactions': 0, 'skipped_lines': 0, 'write_errors': 0, 'slowest_write_ms': 0.0}
+        self.load()
+
+    def load(self):
+        """Rebuild the top entries from the log file, skipping lines a crash may have cut short."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    score, ship, played = json.loads(line)
+                except ValueError:
+                    self.stats['skipped_lines'] += 1
+                    continue
+                self.insert((int(score), ship, played))
+                self.log_lines += 1
+
+    def insert(self, entry):
+        """Put an entry into the sorted top entries; returns its rank (0 is best) or None if it did not make it."""
+        key = (-entry[0], self.order)
+        self.order += 1
+        rank = bisect_right(self.keys, key)
+        if rank >= self.size:
+            return None
+        self.keys.insert(rank, key)
+        self.entries.insert(rank, entry)
+        if len(self.keys) > self.size:
+            self.keys.pop()
+            self.entries.pop()
+        return rank
+
+    def submit(self, score, ship):
+        """Record a finished round and queue it for the log; returns its rank in the top entries, or None."""
+        entry = (score, ship, int(time.time()))
+        rank = self.insert(entry)
+        self.stats['submitted'] += 1
+        self.log_lines += 1
+        self.executor.submit(self.append, json.dumps(entry, separators=(',', ':')) + '\n')
+        if self.log_lines >= len(self.entries) + self.compact_every:
+            self.executor.submit(self.compact, list(self.entries))  # Snapshot: later rounds are appended after it
+            self.log_lines = len(self.entries)
+        return rank
+
+    def top(self, count=None):
+        """Return the best (score, ship, time) entries, best first."""
+        return self.entries[:count]
+
+    def append(self, line):
+        """Append one line to the log (writer thread)."""
+        start = perf_counter()
+        try:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self.file = open(self.path, 'a')
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())  # A kiosk may lose power at any time
+        except OSError:
+            self.stats['write_errors'] += 1  # A full or read-only disk costs the score, not the game
+            return
+        self.stats['written'] += 1
+        self.stats['slowest_write_ms'] = max(self.stats['slowest_write_ms'], (perf_counter() - start) * 1000)
+
+    def compact(self, entries):
+        """Replace the log with just the given entries (writer thread)."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        temporary_path = self.path + '.tmp'
+        try:
+            with open(temporary_path, 'w') as file:
+                file.writelines(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, self.path)  # Never leave a half-written log behind
+        except OSError:
+            self.stats['write_errors'] += 1
+            return
+        self.stats['compactions'] += 1
+
+    def close(self):
+        """Wait for queued writes to finish and close the log."""
+        self.executor.shutdown(wait=True)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def report(self):
+        """Return the counters as one line of text."""
+        return ', '.join(f'{value:.2f} {name}' if isinstance(value, float) else f'{value} {name}' for name, value in self.stats.items())
+
+def measure(rounds=2000, history=20000, folder='.cache'):
+    """Time game over with the leaderboard against rewriting a JSON file of every score, as a kiosk would add up."""
+    import random
+    path = os.path.join(folder, 'leaderboard_measure.log')
+    naive_path = os.path.join(folder, 'leaderboard_measure.json')
+    for stale in (path, naive_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+    rng = random.Random(0)
+    scores = [rng.randint(0, 5000) for _ in range(rounds)]
+
+    all_scores = [rng.randint(0, 5000) for _ in range(history)]  # Rounds played before, kept by the naive approach
+    start = perf_counter()
+    for score in scores:
+        all_scores.append(score)
+        with open(naive_path, 'w') as file:
+            json.dump(sorted(all_scores, reverse=True), file)
+    naive_us = (perf_counter() - start) / rounds * 1e6
+
+    board = Leaderboard(path)
+    start = perf_counter()
+    for score in scores:
+        board.submit(score, 'red_ship.png')
+    submit_us = (perf_counter() - start) / rounds * 1e6
+    board.close()
+
+    reloaded = Leaderboard(path)
+    reloaded.close()
+    same = [entry[0] for entry in reloaded.top()] == [entry[0] for entry in board.top()]
+    print(f'rewrite JSON of {history}+ scores: {naive_us:8.1f} us per game over')
+    print(f'leaderboard submit:              {submit_us:8.1f} us per game over (writes on the background thread)')
+    print(f'writer: {board.report()}')
+    print(f'log reloaded with the same top {board.size}: {same}, {os.path.getsize(path)} bytes on disk')
+    os.remove(path)
+    os.remove(naive_path)
+    return naive_us, submit_us
+
+if __name__ == '__main__':
+    measure()
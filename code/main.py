@@ -1,336 +1,918 @@
 import pygame 
 import os
+import sys
+import atexit
+from time import perf_counter
 from os.path import join
-from random import randint, uniform
-import json
+from random import Random
+from assets import AssetManager
+from audio import AudioManager
+from config import load_settings
+from engine import EntityEngine
+from governor import QualityGovernor
+from leaderboard import Leaderboard
+from collision import SpatialHash, TieredCollider, grid_spritecollide, surface_shape
+from pool import Pool, PooledSprite
+from profiler import FrameProfiler
+from render import clear_rects, draw_batched
+from snapshot import RewindBuffer, pack_snapshot, unpack_snapshot, RECORD_FIELDS
+from replay import InputRecorder
+from text import TextCache
+
+# Headless mode (SPACESHOOTER_HEADLESS=1) runs on SDL's dummy drivers, e.g. for benchmarks and CI
+if os.environ.get('SPACESHOOTER_HEADLESS'):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+# Settings from settings.json, SPACESHOOTER_<NAME> variables and, when run as a script, the command line (see config.py)
+settings = load_settings(sys.argv[1:] if __name__ == '__main__' else ())
 
 # Initialize pygame
 pygame.init()
 
-# Set up display window
+# Logical playfield size: the game logic, collisions and menus always work in these coordinates
 WINDOW_WIDTH, WINDOW_HEIGHT = 1600, 900
-display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+RENDER_SCALE = settings['render_scale']  # Game frames are drawn at the playfield size times this
+RENDER_WIDTH, RENDER_HEIGHT = round(WINDOW_WIDTH * RENDER_SCALE), round(WINDOW_HEIGHT * RENDER_SCALE)
+
+# Set up display window; game frames are drawn on display_surface and present() shows them in window_surface
+if (RENDER_WIDTH, RENDER_HEIGHT) == (settings['window_width'], settings['window_height']):
+    window_surface = display_surface = pygame.display.set_mode((RENDER_WIDTH, RENDER_HEIGHT))
+elif settings['upscale'] == 'scaled':
+    window_surface = display_surface = pygame.display.set_mode((RENDER_WIDTH, RENDER_HEIGHT), pygame.SCALED)  # SDL upscales on the GPU
+else:
+    window_surface = pygame.display.set_mode((settings['window_width'], settings['window_height']))
+    display_surface = pygame.Surface((RENDER_WIDTH, RENDER_HEIGHT)).convert()  # Opaque, smoothscaled into the window every frame
+# Menus are drawn at the playfield size and resized into the window when it is another size
+menu_surface = window_surface if window_surface.get_size() == (WINDOW_WIDTH, WINDOW_HEIGHT) else pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
 pygame.display.set_caption('Space Shooter')  # Set the window title
 clock = pygame.time.Clock()  # Create clock to manage the frame rate
 
-# Load assets (images, fonts, sounds)
-star_surf = pygame.image.load(join('images', 'star.png')).convert_alpha()
-meteor_surf = pygame.image.load(join('images', 'meteor.png')).convert_alpha()
-laser_surf = pygame.image.load(join('images', 'laser.png')).convert_alpha()
-font = pygame.font.Font(join('images', 'Oxanium-Bold.ttf'), 40)
-explosion_frames = [pygame.image.load(join('images', 'explosion', f'{i}.png')).convert_alpha() for i in range(21)]
-laser_sound = pygame.mixer.Sound(join('audio', 'laser.wav'))
-laser_sound.set_volume(0.5)
-explosion_sound = pygame.mixer.Sound(join('audio', 'explosion.wav'))
-game_music = pygame.mixer.Sound(join('audio', 'game_music.wav'))
-game_music.set_volume(0.4)
-
-# Load assets
-font = pygame.font.Font(join('images', 'Oxanium-Bold.ttf'), 40)
+# Load assets: images are decoded on a thread pool while the menu is shown and converted on first use.
+# A packed copy of the pixels in .cache/ makes later starts faster and is rebuilt when the images change.
 ship_images = ['red_ship.png', 'blue_ship.png', 'green_ship.png', 'orange_ship.png']
 ship_index = 0
+rng = Random()  # Every random game decision goes through this, so seeding it makes a run reproducible
+IMAGE_FILES = [join('images', name) for name in ['star.png', 'meteor.png', 'laser.png', *ship_images]]
+IMAGE_FILES += [join('images', 'explosion', f'{i}.png') for i in range(21)]
+assets = AssetManager(IMAGE_FILES, cache_path=join('.cache', 'assets.pack'))
+assets.prefetch()  # Start decoding everything in the background
+font = assets.font(join('images', 'Oxanium-Bold.ttf'), 40)  # The only asset the first menu needs
+small_font = assets.font(join('images', 'Oxanium-Bold.ttf'), 28)  # High score table
+hud_font = font if RENDER_SCALE == 1 else assets.font(join('images', 'Oxanium-Bold.ttf'), max(1, round(40 * RENDER_SCALE)))  # Score at render size
+audio = AudioManager(voices=8)  # Sound effects share 8 voices; music streams separately
+MUSIC_FILE = join('audio', 'game_music.wav')  # Streamed while playing, the game runs silently without it
+
+# Game images, filled in by load_game_assets() when the first game starts
+star_surf = meteor_surf = laser_surf = None
+explosion_frames = meteor_frames = []
+meteor_frame_index = {}  # Meteor rotation image -> its index in meteor_frames, for snapshots
+
+# Entity engine: 'sprites' (default) updates every meteor and laser as a Sprite,
+# 'arrays' keeps them in NumPy arrays and moves, collides and draws them in bulk (needs NumPy)
+ENTITY_ENGINE = settings['engine']
+entity_engine = None  # EntityEngine instance when ENTITY_ENGINE is 'arrays'
+
+def load_game_assets():
+    """Convert the prefetched game images, build the meteor rotation frames and load the sounds (only once)."""
+    global star_surf, meteor_surf, laser_surf, explosion_frames, meteor_frames, meteor_frame_index, entity_engine
+    if star_surf is not None:
+        return
+    star_surf = assets.image(join('images', 'star.png'))
+    meteor_surf = assets.image(join('images', 'meteor.png'))
+    laser_surf = assets.image(join('images', 'laser.png'))
+    explosion_frames = [assets.image(join('images', 'explosion', f'{i}.png')) for i in range(21)]
+    rotated = assets.frames(f'meteor.png rotated {METEOR_ROTATION_STEPS} times',  # Cached with the images, only masks are rebuilt
+                            lambda: [(surf, radius) for surf, _, radius in build_rotation_frames(meteor_surf, METEOR_ROTATION_STEPS)])
+    meteor_frames = [(surf, *surface_shape(surf, radius)) for surf, radius in rotated]
+    meteor_frame_index = {frame[0]: index for index, frame in enumerate(meteor_frames)}
+    audio.load('laser', assets.sound(join('audio', 'laser.wav'), volume=0.5), priority=1)  # Missing files give a silent stand-in
+    audio.load('explosion', assets.sound(join('audio', 'explosion.wav')), priority=2)  # Explosions may cut off lasers, not the reverse
+    if ENTITY_ENGINE == 'arrays':
+        entity_engine = EntityEngine(meteor_frames, laser_surf, *surface_shape(laser_surf), WINDOW_HEIGHT)
+        if RENDER_SCALE != 1:
+            entity_engine.set_render_scale(RENDER_SCALE, scale_image)
 
 def load_ship(index):
-    return pygame.image.load(join('images', ship_images[index])).convert_alpha()
-
-# Button for starting the game
-button_rect = pygame.Rect(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 - 50, 200, 100)
+    return assets.image(join('images', ship_images[index]))
+
+# Rendered text is cached (LRU) and numbers are drawn from a digit atlas, so menus and the HUD rarely rasterize text
+text_cache = TextCache()
+
+def render_label(text, color):
+    """Return the rendered surface for a piece of text, rendering it only on a cache miss."""
+    return text_cache.render(font, text, color)
+
+# Events after which a menu has to present its screen again (window uncovered or restored)
+REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED)
+
+def wait_for_menu_event():
+    """Sleep until the next event instead of busy-looping; closes the game if the window is closed."""
+    event = pygame.event.wait()
+    if event.type == pygame.QUIT:
+        pygame.quit()
+        exit()
+    if event.type == pygame.MOUSEBUTTONDOWN and menu_surface is not window_surface:
+        event = pygame.event.Event(event.type, {**event.dict, 'pos': to_logical(event.pos)})  # Buttons are laid out in playfield coordinates
+    return event
+
+def to_logical(pos):
+    """Map a window position (mouse) to playfield coordinates."""
+    width, height = window_surface.get_size()
+    return int(pos[0] * WINDOW_WIDTH / width), int(pos[1] * WINDOW_HEIGHT / height)
+
+def build_rotation_frames(surf, steps):
+    """Pre-rotate a surface at evenly spaced angles, pairing each frame with its own mask and bounding radius."""
+    frames = []
+    for i in range(steps):
+        rotated_surf = pygame.transform.rotozoom(surf, i * 360 / steps, 1)  # Rotate once at load time
+        frames.append((rotated_surf, *surface_shape(rotated_surf)))  # Mask and radius match the rotated shape
+    return frames
+
+# Meteor rotation atlas (5 degree steps), so meteors never rotate surfaces while playing
+METEOR_ROTATION_STEPS = 72
+
+# Buttons of the menu screens
+button_rect = pygame.Rect(WINDOW_WIDTH // 2 - 125, WINDOW_HEIGHT // 1.5, 250, 100)  # "Start Game" on the main menu
+left_arrow = pygame.Rect(WINDOW_WIDTH // 2 - 200, WINDOW_HEIGHT // 2, 50, 50)  # Previous ship
+right_arrow = pygame.Rect(WINDOW_WIDTH // 2 + 150, WINDOW_HEIGHT // 2, 50, 50)  # Next ship
+select_button = pygame.Rect(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 1.5, 200, 100)  # Confirm ship
+play_again_rect = pygame.Rect(WINDOW_WIDTH // 2 - 275, WINDOW_HEIGHT // 1.5, 280, 110)  # Game over: play again
+back_to_menu_rect = pygame.Rect(WINDOW_WIDTH // 2 + 25, WINDOW_HEIGHT // 1.5, 280, 110)  # Game over: back to menu
+
+# Screens of the game; run() switches between them in one flat loop instead of the screens calling each other
+MENU, SHIP_SELECT, PLAYING, GAME_OVER = 'menu', 'ship_select', 'playing', 'game_over'
+SPAWN_INTERVAL = 0.2  # Seconds of game time between meteor spawns
+METEOR_SPEED = (400, 500)  # Range meteor speeds are drawn from, in pixels per second
+LASER_COOLDOWN = 400  # Milliseconds between two shots
+
+# Fixed-step simulation: the game always advances in SIM_DT steps, whatever the frame rate, and is drawn
+# interpolated between the last two steps. A slow frame runs at most MAX_SIM_STEPS steps and drops the rest.
+SIM_RATE = 120  # Simulation steps per second
+SIM_DT = 1 / SIM_RATE
+MAX_SIM_STEPS = settings['max_steps']
+# Frame rate cap while playing: by default the display's refresh rate (60 if SDL does not know it), 0 for uncapped
+RENDER_FPS = settings['fps'] if settings['fps'] >= 0 else pygame.display.get_current_refresh_rate() or 60
 
 # Game states and variables
+state = MENU  # Screen currently shown
+redraw = True  # Whether the current menu screen has to be repainted
 game_running = False  # Keeps track of whether the game is running or not
 score = 0  # Variable to track the score
+elapsed_time = 0  # Seconds played in the current game, the score is based on it
+spawn_timer = 0  # Game time since the last meteor spawn (spawns follow game time, not a wall-clock timer, so rounds can be replayed)
+sim_accumulator = 0  # Frame time not yet simulated, always less than one step between frames
+sim_stats = {'steps': 0, 'frames': 0, 'capped_frames': 0, 'dropped_time': 0}  # Counters of the fixed-step loop
+selected_ship = ship_images[0]  # Ship picked on the selection screen
+
+# Rendering mode: 'dirty' repaints only what changed on top of a cached background, 'full' redraws the whole screen every frame
+RENDER_MODE = settings['render']
+DIRTY_SPRITE_LIMIT = 200  # Above this many moving sprites per-sprite clearing costs more than a full redraw
+BACKGROUND_COLOR = '#3a2e3f'
+background_surf = pygame.Surface((RENDER_WIDTH, RENDER_HEIGHT)).convert()  # Background colour with the starfield baked in, at render size
+hud_rect = None  # Screen area covered by the score on the last frame
+sprite_rects = []  # Screen areas of the sprites drawn on the last frame
+redraw_all = True  # Whether the next frame has to repaint the whole screen (new game, menu was showing)
+
+# Frame profiler: F3 (or the profile setting) shows per-phase frame times, the last frames are saved as a Chrome trace on exit
+profiler = FrameProfiler(('events', 'simulate', 'draw', 'display'), font=assets.font(join('images', 'Oxanium-Bold.ttf'), 16),
+                         trace_path=settings['trace'])
+profiler.enabled = settings['profile']
+atexit.register(profiler.dump)  # Also runs when the window is closed, exit() unwinds normally
+
+# Quality governor: when frames take longer than the 16.6 ms budget, detail is dropped in stages (see governor.TIERS)
+# and restored once there is headroom again; the governor setting off (SPACESHOOTER_GOVERNOR=0) keeps full quality
+governor = QualityGovernor() if settings['governor'] else None
+EXPLOSION_CAP = 8  # Most explosions on screen at once from the 'capped explosions' tier on
+quality_tier = 0  # Tier currently applied
+freeze_rotation = False  # Meteors keep their current rotation frame
+explosion_rate = 20  # Explosion animation frames per second; doubled to skip every other frame
+explosion_cap = None  # Most explosions at once, None for no limit
+show_stars = True  # Whether the starfield is drawn
+
+# Input recording: with the record setting (SPACESHOOTER_RECORD=<folder>) every round's seed, input and frame times are saved for code/replay.py
+recorder = InputRecorder(settings['record']) if settings['record'] else None
+
+# High scores: every finished round goes to an append-only log on a background thread, the top 10 are kept in memory
+leaderboard = Leaderboard(settings['leaderboard']) if settings['leaderboard'] else None
+if leaderboard:
+    atexit.register(leaderboard.close)  # Finish queued writes before exiting
+last_rank = None  # Place of the last round in the high scores, None if it did not make it
+
+# Rewind (opt-in, for debugging): every frame's snapshot (see snapshot()) goes into a ring buffer, holding Backspace plays
+# it backwards. Off while recording, a recording cannot replay a rewind. Rounds that were rewound never reach the high scores.
+rewind_buffer = RewindBuffer(settings['rewind'], SIM_RATE) if settings['rewind'] > 0 and not recorder else None
+rewound_round = False  # Whether the current round has been rewound
+
+# Drawing layers, back to front: sprites are drawn one layer at a time, batched by image (see render.py)
+SPRITE_LAYERS = ('stars', 'meteors', 'lasers', 'explosions', 'player')
 
 # Sprite groups to manage different types of game objects
-all_sprites = pygame.sprite.Group()  
+all_sprites = pygame.sprite.Group()  # Moving sprites, drawn with render.draw_batched()
+star_sprites = pygame.sprite.Group()  # Static background stars
 meteor_sprites = pygame.sprite.Group()  
 laser_sprites = pygame.sprite.Group()  
+meteor_grid = SpatialHash(WINDOW_WIDTH, WINDOW_HEIGHT)  # Broadphase grid rebuilt from meteor rects every frame
+narrowphase = TieredCollider()  # Rect -> circle -> mask collider (TieredCollider(counting=True) keeps per-tier counts)
 
 # Player class represents the player character in the game
 class Player(pygame.sprite.Sprite):
+    layer = 4  # Drawn on top of everything
+
     def __init__(self, groups, selected_ship):
         super().__init__(groups)
-        self.image = pygame.image.load(join('images', selected_ship)).convert_alpha()  # Load player image
+        self.image = assets.image(join('images', selected_ship))  # Cached player image
         self.rect = self.image.get_rect(center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))  # Set initial position
+        self.position = pygame.Vector2(self.rect.center)  # Exact position, the rect only holds whole pixels
+        self.previous = pygame.Vector2(self.position)  # Position before the last step, for interpolated drawing
         self.direction = pygame.Vector2()  # Store movement direction
         self.speed = 300  # Player speed
         self.can_shoot = True  # Whether the player can shoot
         self.laser_shoot_time = 0  # Time of last shot (for cooldown)
-        self.cooldown_duration = 400  # Cooldown in milliseconds for shooting
-        self.mask = pygame.mask.from_surface(self.image)  # Used for pixel-perfect collisions
+        self.cooldown_duration = LASER_COOLDOWN  # Cooldown in milliseconds for shooting
+        self.elapsed_time = 0  # Game time in milliseconds, advanced by dt rather than the wall clock
+        self.controls = pygame.key.get_pressed  # Input source, replaced with scripted keys in headless runs
+        self.mask, self.radius = surface_shape(self.image)  # Used for pixel-perfect collisions
     
     def laser_timer(self):
         """Handles the shooting cooldown, allowing the player to shoot again after a set time."""
-        if not self.can_shoot and pygame.time.get_ticks() - self.laser_shoot_time >= self.cooldown_duration:
+        if not self.can_shoot and self.elapsed_time - self.laser_shoot_time >= self.cooldown_duration:
             self.can_shoot = True
     
     def update(self, dt):
         """Handles player movement and shooting."""
-        keys = pygame.key.get_pressed()  # Get the current key presses
+        self.elapsed_time += dt * 1000  # Advance the player's game clock
+        keys = self.controls()  # Get the current key presses
         self.direction.x = int(keys[pygame.K_RIGHT]) - int(keys[pygame.K_LEFT])  # Horizontal movement
         self.direction.y = int(keys[pygame.K_DOWN]) - int(keys[pygame.K_UP])  # Vertical movement
         self.direction = self.direction.normalize() if self.direction else self.direction  # Normalize direction vector
-        self.rect.center += self.direction * self.speed * dt  # Move player
+        self.previous.update(self.position)
+        self.position += self.direction * self.speed * dt  # Move player
+        self.rect.center = self.position
         
         if keys[pygame.K_SPACE] and self.can_shoot:  # If spacebar is pressed and the player can shoot
-            Laser(laser_surf, self.rect.midtop, (all_sprites, laser_sprites))  # Create new laser object
+            fire_laser(self.rect.midtop)  # Create new laser
             self.can_shoot = False  # Set shooting cooldown
-            self.laser_shoot_time = pygame.time.get_ticks()  # Record the time of shot
-            laser_sound.play()  # Play laser sound
+            self.laser_shoot_time = self.elapsed_time  # Record the time of shot
+            audio.play('laser')  # Play laser sound
         
         self.laser_timer()  # Check and handle laser cooldown
 
-class Laser(pygame.sprite.Sprite):
+class Laser(PooledSprite):
+    layer = 2
+
     def __init__(self, surf, pos, groups):
-        super().__init__(groups)
+        self.position = pygame.Vector2()  # Reused by every spawn of this instance
+        self.previous = pygame.Vector2()
+        super().__init__(surf, pos, groups)
+
+    def spawn(self, surf, pos, groups):
+        """Arm the laser at the player's position."""
         self.image = surf  # Laser image
         self.rect = self.image.get_rect(midbottom=pos)  # Position the laser at the player's position
+        self.position.update(self.rect.center)
+        self.previous.update(self.position)
+        self.mask, self.radius = surface_shape(self.image)  # Shared collision mask for every laser
+        self.add(groups)
     
     def update(self, dt):
         """Move the laser upwards and delete it if it goes off-screen."""
-        self.rect.centery -= 400 * dt  # Move laser upwards
+        self.previous.update(self.position)
+        self.position.y -= 400 * dt  # Move laser upwards
+        self.rect.center = self.position
         if self.rect.bottom < 0:  # If the laser goes off-screen, remove it
             self.kill()
 
 class Star(pygame.sprite.Sprite):
+    layer = 0
+
     def __init__(self, groups, surf):
         super().__init__(groups)
         self.image = surf  # Star image
-        self.rect = self.image.get_rect(center=(randint(0, WINDOW_WIDTH), randint(0, WINDOW_HEIGHT)))  # Random position
+        self.rect = self.image.get_rect(center=(rng.randint(0, WINDOW_WIDTH), rng.randint(0, WINDOW_HEIGHT)))  # Random position
 
-class Meteor(pygame.sprite.Sprite):
-    def __init__(self, surf, pos, groups):
-        super().__init__(groups)
-        self.original_surf = surf  # Save original meteor image for rotation
-        self.image = surf
+class Meteor(PooledSprite):
+    layer = 1
+
+    def __init__(self, frames, pos, groups):
+        self.direction = pygame.Vector2()  # Reused by every spawn of this instance
+        self.position = pygame.Vector2()
+        self.previous = pygame.Vector2()
+        super().__init__(frames, pos, groups)
+
+    def spawn(self, frames, pos, groups):
+        """Arm the meteor at pos with a random direction, speed and spin."""
+        self.frames = frames  # Pre-rotated (surface, mask, radius) frames
+        self.image, self.mask, self.radius = self.frames[0]  # Start unrotated
         self.rect = self.image.get_rect(center=pos)
-        self.direction = pygame.Vector2(uniform(-0.5, 0.5), 1)  # Random direction
-        self.speed = randint(400, 500)  # Random speed for each meteor
-        self.rotation_speed = randint(40, 80)  # Random rotation speed
+        self.position.update(self.rect.center)
+        self.previous.update(self.position)
+        self.direction.update(rng.uniform(-0.5, 0.5), 1)  # Random direction
+        self.speed = rng.randint(*METEOR_SPEED)  # Random speed for each meteor
+        self.rotation_speed = rng.randint(40, 80)  # Random rotation speed
         self.rotation = 0
-        self.mask = pygame.mask.from_surface(self.image)  # Collision mask
+        self.add(groups)
     
     def update(self, dt):
         """Update meteor position and rotation."""
-        self.rect.center += self.direction * self.speed * dt  # Move meteor
-        self.rotation += self.rotation_speed * dt  # Apply rotation
-        self.image = pygame.transform.rotozoom(self.original_surf, self.rotation, 1)  # Apply rotation to image
-        self.rect = self.image.get_rect(center=self.rect.center)  # Update the rect with the new rotated image
+        self.previous.update(self.position)
+        self.position += self.direction * self.speed * dt  # Move meteor
+        if not freeze_rotation:  # The quality governor may skip the frame swap and rect resize
+            self.rotation += self.rotation_speed * dt  # Apply rotation
+            frame_index = int(self.rotation * len(self.frames) / 360) % len(self.frames)  # Quantized pre-rotated frame
+            self.image, self.mask, self.radius = self.frames[frame_index]  # Swap in the rotated image and its matching mask
+            self.rect.size = self.image.get_size()  # Resize the rect in place for the new rotated image
+        self.rect.center = self.position
 
         if self.rect.top > WINDOW_HEIGHT:  # If meteor moves off-screen, remove it
             self.kill()
 
-class AnimatedExplosion(pygame.sprite.Sprite):
-    def __init__(self, frames, pos, groups):
-        super().__init__(groups)
+class AnimatedExplosion(PooledSprite):
+    layer = 3
+
+    def spawn(self, frames, pos, groups, sound=True):
+        """Restart the explosion animation at pos."""
         self.frames = frames  # List of frames for explosion animation
         self.frame_index = 0  # Current frame index
         self.image = self.frames[self.frame_index]  # Set initial frame as the first explosion frame
         self.rect = self.image.get_rect(center=pos)  # Position of explosion
-        explosion_sound.play()  # Play explosion sound
+        self.add(groups)
+        if sound:  # Silent when a snapshot is restored
+            audio.play('explosion')  # Play explosion sound
     
     def update(self, dt):
         """Animate the explosion frames."""
-        self.frame_index += 20 * dt  # Move through frames over time
+        self.frame_index += explosion_rate * dt  # Move through frames over time
         if self.frame_index < len(self.frames):
             self.image = self.frames[int(self.frame_index)]  # Update to the next frame
         else:
             self.kill()  # After all frames are shown, remove explosion
 
+# Record kinds of every sprite type in snapshots
+SPRITE_KINDS = {Player: 0, Laser: 1, Meteor: 2, AnimatedExplosion: 3}
+
+# Pools that recycle killed lasers, meteors and explosions
+laser_pool = Pool(Laser)
+meteor_pool = Pool(Meteor)
+explosion_pool = Pool(AnimatedExplosion)
+
+def pool_stats():
+    """Return the size counters of every entity pool."""
+    return {'lasers': laser_pool.stats(), 'meteors': meteor_pool.stats(), 'explosions': explosion_pool.stats()}
+
 # Function to clear all game objects (called at the start of a new game)
 def clear_game_objects():
-    all_sprites.empty()  
-    meteor_sprites.empty()  
-    laser_sprites.empty() 
+    for sprite in all_sprites.sprites():
+        sprite.kill()  # Kill rather than empty the groups, so pooled sprites go back to their pools
+    star_sprites.empty()
+    if entity_engine:
+        entity_engine.clear()
+
+# Scatter the background stars and bake them into the cached background
+def create_starfield():
+    for _ in range(20):
+        Star(star_sprites, star_surf)
+    bake_background()
+
+def bake_background():
+    """Composite the background colour and the stars once, for dirty-rect frames to repaint from."""
+    global redraw_all
+    background_surf.fill(BACKGROUND_COLOR)
+    if show_stars:
+        saved = project_sprites(star_sprites, 1) if RENDER_SCALE != 1 else ()
+        draw_batched(background_surf, star_sprites.sprites(), len(SPRITE_LAYERS))  # One fblits call for every star
+        restore_projection(saved)
+    redraw_all = True
+
+# Spawn a meteor just above the top of the screen (returns the sprite, or None with the array engine)
+def spawn_meteor():
+    pos = (rng.randint(0, WINDOW_WIDTH), rng.randint(-100, 0))
+    if entity_engine:
+        entity_engine.spawn_meteor(pos, rng.uniform(-0.5, 0.5), rng.randint(*METEOR_SPEED), rng.randint(40, 80))  # Same draws as Meteor.spawn
+        return None
+    return meteor_pool.acquire(meteor_frames, pos, (all_sprites, meteor_sprites))
+
+# Show an explosion, unless the quality governor caps them and the cap is reached
+def spawn_explosion(center):
+    if explosion_cap is not None and explosion_pool.active() >= explosion_cap:
+        return None
+    return explosion_pool.acquire(explosion_frames, center, all_sprites)
+
+# Switch the quality governor's cuts on or off for a tier
+def apply_quality(tier):
+    global quality_tier, freeze_rotation, explosion_rate, explosion_cap, show_stars
+    quality_tier = tier
+    freeze_rotation = tier >= 1
+    explosion_rate = 40 if tier >= 2 else 20
+    explosion_cap = EXPLOSION_CAP if tier >= 3 else None
+    if entity_engine:
+        entity_engine.rotate = not freeze_rotation
+    if show_stars != (tier < 4):
+        show_stars = tier < 4
+        bake_background()  # Rebuild the cached background with or without the stars
+
+# Advance the round clock: score and meteor spawns
+def advance_round(dt):
+    global score, elapsed_time, spawn_timer
+    elapsed_time += dt
+    score = int(elapsed_time * 10)  # One point per 100 ms survived
+    spawn_timer += dt
+    while spawn_timer >= SPAWN_INTERVAL:
+        spawn_timer -= SPAWN_INTERVAL
+        spawn_meteor()  # Spawn a new meteor
+
+# One fixed step of the simulation, returns True if the player was hit
+def sim_step():
+    advance_round(SIM_DT)  # Score and meteor spawns
+    update_entities(SIM_DT)  # Move the player, meteors, lasers and explosions
+    return check_collisions()  # Check for collisions (player with meteors, lasers with meteors)
+
+# Run the fixed steps that a frame of frame_dt seconds covers, returns True if the player was hit
+def simulate(frame_dt):
+    global sim_accumulator
+    sim_accumulator += frame_dt
+    steps = 0
+    while sim_accumulator >= SIM_DT - 1e-9 and steps < MAX_SIM_STEPS:  # Tolerance: two 1/120 s steps fill a 1/60 s frame
+        sim_accumulator -= SIM_DT
+        steps += 1
+        if sim_step():
+            break  # The round is over, nothing left to simulate
+    sim_stats['steps'] += steps
+    sim_stats['frames'] += 1
+    if sim_accumulator >= SIM_DT - 1e-9:  # Hit the step limit: drop the backlog rather than fall further behind
+        sim_stats['capped_frames'] += 1
+        sim_stats['dropped_time'] += sim_accumulator
+        sim_accumulator = 0
+    sim_accumulator = max(sim_accumulator, 0)
+    return not game_running
+
+# Fraction of a step the simulation owes the screen, for drawing between the last two steps
+def interpolation_alpha():
+    return sim_accumulator / SIM_DT
+
+# Fire a laser from the given position
+def fire_laser(pos):
+    if entity_engine:
+        entity_engine.spawn_laser(pos)
+    else:
+        laser_pool.acquire(laser_surf, pos, (all_sprites, laser_sprites))  # Pooled laser sprite
+
+# Move every entity by one frame
+def update_entities(dt):
+    all_sprites.update(dt)  # Update all sprites
+    if entity_engine:
+        entity_engine.step(dt)  # Meteors and lasers in one vectorized step
  
-# Collision Handling function
+# Collision Handling function, returns True when the player was hit
 def check_collisions():
     global game_running
+    if entity_engine:
+        player_hit, destroyed = entity_engine.collide(player)
+        for center in destroyed:
+            spawn_explosion(center) # Show explosion
+        if player_hit:
+            game_running = False
+        return player_hit
+    meteor_grid.rebuild(meteor_sprites)  # Bucket meteors by grid cell so each query only tests nearby meteors
     # If the player collides with a meteor, end the game
-    if pygame.sprite.spritecollide(player, meteor_sprites, True, pygame.sprite.collide_mask):
-        game_running = False # End the game if player is hit
-        end_game()
-        return  
+    if grid_spritecollide(player, meteor_grid, meteor_sprites, True, narrowphase):
+        game_running = False # End the game if player is hit, play_frame switches to the game over screen
+        return True
     # If lasers hit meteors, destroy them and show an explosion
     for laser in laser_sprites:
-        collided_meteors = pygame.sprite.spritecollide(laser, meteor_sprites, True, pygame.sprite.collide_mask)
+        collided_meteors = grid_spritecollide(laser, meteor_grid, meteor_sprites, True, narrowphase)
         if collided_meteors:
             laser.kill() # Remove laser
             for meteor in collided_meteors:
-                AnimatedExplosion(explosion_frames, meteor.rect.center, all_sprites) # Show explosion
+                spawn_explosion(meteor.rect.center) # Show explosion
+    return False
 
 def create_button(text, x, y, width, height, text_color, button_color, border_radius=10):
     button_rect = pygame.Rect(x, y, width, height)  # Create button rectangle
-    pygame.draw.rect(display_surface, button_color, button_rect, border_radius=border_radius)  # Draw button with rounded corners
-    text_surf = font.render(text, True, text_color)  # Render text surface
+    pygame.draw.rect(menu_surface, button_color, button_rect, border_radius=border_radius)  # Draw button with rounded corners
+    text_surf = render_label(text, text_color)  # Cached text surface
     text_rect = text_surf.get_rect(center=button_rect.center)  # Center text inside button
-    display_surface.blit(text_surf, text_rect)  # Draw text on button
+    menu_surface.blit(text_surf, text_rect)  # Draw text on button
     return button_rect  # Return button rect for interaction handling
 
-# Display the current score on the screen
+# Draw sprites part of the way from their previous to their current position (alpha 0 is previous, 1 is current)
+def interpolate_sprites(alpha):
+    """Move the rects of moving sprites to their interpolated positions; returns the moves for restore_sprites()."""
+    moved = []
+    for sprite in all_sprites.sprites():
+        previous = getattr(sprite, 'previous', None)  # Explosions and stars do not move
+        if previous is None:
+            continue
+        position = sprite.position
+        dx = int(previous.x + (position.x - previous.x) * alpha) - int(position.x)
+        dy = int(previous.y + (position.y - previous.y) * alpha) - int(position.y)
+        if dx or dy:
+            sprite.rect.move_ip(dx, dy)
+            moved.append((sprite, dx, dy))
+    return moved
+
+def restore_sprites(moved):
+    """Put the rects moved by interpolate_sprites() back where the simulation has them."""
+    for sprite, dx, dy in moved:
+        sprite.rect.move_ip(-dx, -dy)
+
+# At a render scale other than 1 sprites are drawn with resized copies of their images at scaled positions
+scaled_images = {}  # Playfield image -> the same image at RENDER_SCALE
+
+def scale_image(surf):
+    """Return surf resized to the render scale, resizing each image only once."""
+    image = scaled_images.get(surf)
+    if image is None:
+        size = (max(1, round(surf.get_width() * RENDER_SCALE)), max(1, round(surf.get_height() * RENDER_SCALE)))
+        image = scaled_images[surf] = pygame.transform.smoothscale(surf, size).convert_alpha()
+    return image
+
+def project_sprites(sprites, alpha):
+    """Give sprites their render-size image and a rect at their scaled, interpolated position; returns what to restore."""
+    saved = []
+    for sprite in sprites:
+        previous = getattr(sprite, 'previous', None)
+        if previous is None or alpha >= 1:
+            x, y = sprite.rect.center
+        else:
+            position = sprite.position
+            x = int(previous.x + (position.x - previous.x) * alpha)
+            y = int(previous.y + (position.y - previous.y) * alpha)
+        saved.append((sprite, sprite.image, sprite.rect))
+        sprite.image = scale_image(sprite.image)
+        sprite.rect = sprite.image.get_rect(center=(int(x * RENDER_SCALE), int(y * RENDER_SCALE)))
+    return saved
+
+def restore_projection(saved):
+    """Give the sprites changed by project_sprites() back their playfield image and rect."""
+    for sprite, image, rect in saved:
+        sprite.image, sprite.rect = image, rect
+
+# Draw one frame of the game (without flipping the display)
+def draw_game(alpha=1.0):
+    """Draw the background, sprites (interpolated by alpha) and score; returns the changed screen areas, or None if everything changed."""
+    if RENDER_SCALE != 1:
+        saved = project_sprites(all_sprites.sprites(), alpha)
+        dirty_rects = draw_sprites(alpha)
+        restore_projection(saved)
+        return dirty_rects
+    moved = interpolate_sprites(alpha) if alpha < 1 else ()
+    dirty_rects = draw_sprites(alpha)
+    restore_sprites(moved)
+    return dirty_rects
+
+def draw_sprites(alpha):
+    """Draw the frame with the sprite rects already at their drawing positions."""
+    global hud_rect, redraw_all, sprite_rects
+    if RENDER_MODE == 'full' or entity_engine or len(all_sprites) > DIRTY_SPRITE_LIMIT:  # Reference path: redraw everything
+        display_surface.blit(background_surf, (0, 0))  # Background colour and stars
+        # Draw all sprites (player, meteors, lasers, etc.); the array engine's meteors and lasers go in their own layers,
+        # straight from the arrays, so explosions and the player stay on top of them
+        engine_layers = {SPRITE_LAYERS.index('lasers'): lambda: entity_engine.draw(display_surface, alpha)} if entity_engine else None
+        draw_batched(display_surface, all_sprites.sprites(), len(SPRITE_LAYERS), engine_layers)
+        display_score()  # Display the score on the screen
+        redraw_all = True  # The HUD area was not tracked, so the next dirty frame starts from scratch
+        return None
+
+    if redraw_all:  # First frame of a game: paint the whole background once
+        display_surface.blit(background_surf, (0, 0))
+        sprite_rects = draw_batched(display_surface, all_sprites.sprites(), len(SPRITE_LAYERS))  # Remembered for the next clear
+        hud_rect = display_score()
+        redraw_all = False
+        return None
+
+    clear_rects(display_surface, background_surf, sprite_rects)  # Paint the background over last frame's sprites
+    display_surface.blit(background_surf, hud_rect, hud_rect)  # ...and over last frame's score
+    drawn = draw_batched(display_surface, all_sprites.sprites(), len(SPRITE_LAYERS))
+    dirty_rects = sprite_rects + drawn  # Old and new areas of every sprite
+    sprite_rects = drawn
+    dirty_rects.append(hud_rect)
+    hud_rect = display_score()
+    dirty_rects.append(hud_rect)
+    return dirty_rects
+
+# Capture the whole round as compact bytes (layout in snapshot.py): every sprite, the stars, the round clock and the RNG
+def snapshot():
+    records = []
+    for sprite in all_sprites:
+        kind = SPRITE_KINDS[type(sprite)]
+        if kind == 2:  # Meteor
+            records += (2, *sprite.position, *sprite.previous, *sprite.direction, sprite.speed, sprite.rotation_speed, sprite.rotation,
+                        meteor_frame_index[sprite.image])
+        elif kind == 1:  # Laser
+            records += (1, *sprite.position, *sprite.previous, 0, 0, 0, 0, 0, 0)
+        elif kind == 3:  # Explosion
+            records += (3, *sprite.rect.center, 0, 0, sprite.frame_index, 0, 0, 0, 0, 0)
+        else:  # Player
+            records += (0, *sprite.position, *sprite.previous, sprite.can_shoot, sprite.laser_shoot_time, sprite.elapsed_time, 0, 0, 0)
+    stars = []
+    for star in star_sprites:
+        stars += star.rect.center
+    round_state = {'engine': ENTITY_ENGINE, 'score': score, 'tier': quality_tier, 'running': game_running, 'elapsed_time': elapsed_time,
+                   'spawn_timer': spawn_timer, 'sim_accumulator': sim_accumulator,
+                   'meteors': entity_engine.meteors.count if entity_engine else 0, 'lasers': entity_engine.lasers.count if entity_engine else 0}
+    return pack_snapshot(round_state, records, stars, rng.getstate(), entity_engine.save() if entity_engine else b'')
+
+# Put the round back exactly as snapshot() captured it
+def restore_snapshot(data):
+    global score, elapsed_time, spawn_timer, sim_accumulator, game_running, redraw_all
+    round_state, records, stars, rng_state, engine_data = unpack_snapshot(data)
+    if round_state['engine'] != ENTITY_ENGINE:
+        raise ValueError(f"snapshot was taken with the {round_state['engine']} engine, this game runs {ENTITY_ENGINE}")
+    for sprite in all_sprites.sprites():
+        sprite.kill()  # Pooled sprites go back to their pools and are re-armed below
+    for index in range(0, len(records), RECORD_FIELDS):
+        kind, x, y, px, py, a, b, c, d, e, f = records[index:index + RECORD_FIELDS]
+        if kind == 2:  # Meteor
+            sprite = meteor_pool.acquire(meteor_frames, (x, y), (all_sprites, meteor_sprites))
+            sprite.direction.update(a, b)
+            sprite.speed, sprite.rotation_speed, sprite.rotation = c, d, e
+            sprite.image, sprite.mask, sprite.radius = meteor_frames[int(f)]
+            sprite.rect.size = sprite.image.get_size()
+        elif kind == 1:  # Laser
+            sprite = laser_pool.acquire(laser_surf, (x, y), (all_sprites, laser_sprites))
+        elif kind == 3:  # Explosion
+            sprite = explosion_pool.acquire(explosion_frames, (x, y), all_sprites, False)
+            sprite.frame_index = a
+            sprite.image = explosion_frames[int(a)]
+            continue
+        else:  # Player
+            sprite = player
+            sprite.add(all_sprites)
+            sprite.can_shoot, sprite.laser_shoot_time, sprite.elapsed_time = bool(a), b, c
+        sprite.position.update(x, y)
+        sprite.previous.update(px, py)
+        sprite.rect.center = sprite.position
+    if entity_engine:
+        entity_engine.load(engine_data, round_state['meteors'], round_state['lasers'])
+
+    centers = [(int(stars[index]), int(stars[index + 1])) for index in range(0, len(stars), 2)]
+    if centers != [star.rect.center for star in star_sprites]:  # Only a snapshot of another round has other stars
+        star_sprites.empty()
+        for center in centers:
+            Star(star_sprites, star_surf).rect.center = center
+        bake_background()
+    if round_state['tier'] != quality_tier:
+        apply_quality(round_state['tier'])
+    if governor:
+        governor.reset(quality_tier)  # Step up or down from the restored tier, not the one before the restore
+
+    score, elapsed_time, spawn_timer = round_state['score'], round_state['elapsed_time'], round_state['spawn_timer']
+    sim_accumulator, game_running = round_state['sim_accumulator'], round_state['running']
+    rng.setstate(rng_state)  # Last: re-arming sprites above drew random numbers
+    redraw_all = True  # Every sprite may have moved
+
+# Entity numbers shown by the profiler
+def entity_counts():
+    if entity_engine:
+        meteors, lasers = entity_engine.meteors.count, entity_engine.lasers.count
+    else:
+        meteors, lasers = len(meteor_sprites), len(laser_sprites)
+    return {'meteors': meteors, 'lasers': lasers, 'sprites': len(all_sprites), 'stars': len(star_sprites), 'tier': quality_tier}
+
+# Display the current score on the screen, returns the area it covers
 def display_score():
-    text_surf = font.render(str(score), True, (240,240,240))  # Render the score text
-    text_rect = text_surf.get_frect(midbottom=(WINDOW_WIDTH / 2, WINDOW_HEIGHT - 50))  # Position the score at the bottom
-    display_surface.blit(text_surf, text_rect)  # Draw the score
-    pygame.draw.rect(display_surface, (240,240,240), text_rect.inflate(20, 10).move(0, -8), 5, 10)  # Draw a border around score
-
-# Main menu function
-def main_menu():
-    global game_running
-    button_rect = pygame.Rect(WINDOW_WIDTH // 2 - 125, WINDOW_HEIGHT // 1.5, 250, 100)  # Button position and size
+    digits = text_cache.digits(hud_font, (240,240,240))  # Score digits, rasterized once
+    text_rect = digits.draw(display_surface, score, midbottom=(RENDER_WIDTH // 2, RENDER_HEIGHT - to_render(50)))  # Draw the score at the bottom
+    border_rect = pygame.draw.rect(display_surface, (240,240,240), text_rect.inflate(to_render(20), to_render(10)).move(0, -to_render(8)),
+                                   max(1, to_render(5)), to_render(10))  # Draw a border around score
+    return border_rect.union(text_rect).inflate(2, 2)  # Small margin for anti-aliased edges
+
+def to_render(length):
+    """Convert a playfield length to render pixels."""
+    return round(length * RENDER_SCALE)
+
+# Show a finished game frame in the window
+def present(dirty_rects):
+    if display_surface is window_surface:
+        if dirty_rects is None:
+            pygame.display.update()  # Everything changed; update(None) would push nothing at all
+        else:
+            pygame.display.update(dirty_rects)  # Push only the changed areas; SDL does a SCALED upscale
+    else:
+        pygame.transform.smoothscale(display_surface, window_surface.get_size(), window_surface)  # CPU upscale of the whole frame
+        pygame.display.flip()
+
+# Show a menu screen, resized into the window when that is not the playfield size
+def present_menu():
+    if menu_surface is not window_surface:
+        pygame.transform.smoothscale(menu_surface, window_surface.get_size(), window_surface)
+    pygame.display.update()
+
+# Switch to another screen
+def change_state(new_state):
+    global state, redraw
+    if state == PLAYING and new_state != PLAYING:
+        audio.stop_music()
+    state = new_state
+    redraw = True
+    if new_state == PLAYING:
+        start_game()
+
+# Main menu: draw and input handling
+def draw_main_menu():
+    menu_surface.fill((30, 30, 30))  # Fill background with dark gray
+    button_text = render_label("Start Game", (0, 0, 0))  # The "Start Game" text
+    pygame.draw.rect(menu_surface, (255, 255, 255), button_rect)  # Draw the button rectangle in white
+    menu_surface.blit(button_text, button_text.get_rect(center=button_rect.center))  # Place the text in the center of the button
+
+def main_menu_event(event):
+    if event.type == pygame.MOUSEBUTTONDOWN and button_rect.collidepoint(event.pos):  # If mouse clicked on button
+        change_state(SHIP_SELECT)  # Open ship selection menu
+
+# Ship selection: draw and input handling
+def draw_ship_selection():
+    menu_surface.fill((30, 30, 30))  # Fill background with dark gray
     
-    while True:
-        display_surface.fill((30, 30, 30))  # Fill background with dark gray
-        button_text = font.render("Start Game", True, (0, 0, 0))  # Render the "Start Game" text
-        pygame.draw.rect(display_surface, (255, 255, 255), button_rect)  # Draw the button rectangle in white
-        display_surface.blit(button_text, button_text.get_rect(center=button_rect.center))  # Place the text in the center of the button
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # Check if the user clicked the close button
-                pygame.quit()
-                exit()
-            if event.type == pygame.MOUSEBUTTONDOWN and button_rect.collidepoint(event.pos):  # If mouse clicked on button
-                selected_ship = ship_selection_menu()  # Open ship selection menu and get the selected ship
-                game_running = True  # Set game_running flag to True
-                game_loop(selected_ship)  # Start the game loop with the selected ship
-        
-        pygame.display.update()  # Update the display
-
-# Skip selection function
-def ship_selection_menu():
-    global ship_index
-    selected_ship = None
+    # Display the preloaded ship image based on current ship_index
+    ship_surf = load_ship(ship_index)
+    ship_rect = ship_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+    menu_surface.blit(ship_surf, ship_rect)
     
-    # Define the positions and sizes of navigation arrows and select button
-    left_arrow = pygame.Rect(WINDOW_WIDTH // 2 - 200, WINDOW_HEIGHT // 2, 50, 50)
-    right_arrow = pygame.Rect(WINDOW_WIDTH // 2 + 150, WINDOW_HEIGHT // 2, 50, 50)
-    select_button = pygame.Rect(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 1.5, 200, 100)
+    # Draw arrows and select button
+    pygame.draw.rect(menu_surface, (255, 255, 255), left_arrow)
+    pygame.draw.rect(menu_surface, (255, 255, 255), right_arrow)
+    pygame.draw.rect(menu_surface, (255, 255, 255), select_button)
     
-    while selected_ship is None:
-        display_surface.fill((30, 30, 30))  # Fill background with dark gray
-        
-        # Load and display the ship image based on current ship_index
-        ship_surf = load_ship(ship_index)
-        ship_rect = ship_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-        display_surface.blit(ship_surf, ship_rect)
-        
-        # Draw arrows and select button
-        pygame.draw.rect(display_surface, (255, 255, 255), left_arrow)
-        pygame.draw.rect(display_surface, (255, 255, 255), right_arrow)
-        pygame.draw.rect(display_surface, (255, 255, 255), select_button)
-        
-        # Render text for the arrows and select button
-        left_text = font.render("<", True, (0, 0, 0))
-        right_text = font.render(">", True, (0, 0, 0))
-        select_text = font.render("Select", True, (0, 0, 0))
-        
-        # Display text on the respective UI elements
-        display_surface.blit(left_text, left_text.get_rect(center=left_arrow.center))
-        display_surface.blit(right_text, right_text.get_rect(center=right_arrow.center))
-        display_surface.blit(select_text, select_text.get_rect(center=select_button.center))
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # Handle quit event
-                pygame.quit()
-                exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if left_arrow.collidepoint(event.pos):  # Decrease ship_index to show previous ship
-                    ship_index = (ship_index - 1) % len(ship_images)
-                elif right_arrow.collidepoint(event.pos):  # Increase ship_index to show next ship
-                    ship_index = (ship_index + 1) % len(ship_images)
-                elif select_button.collidepoint(event.pos):  # Select current ship
-                    selected_ship = ship_images[ship_index]
-                    return selected_ship
-        
-        pygame.display.update()  # Update display to reflect changes
-
-
-# Main game loop
-def game_loop(selected_ship):
-    global game_running, player, score
-
+    # Cached text for the arrows and select button
+    left_text = render_label("<", (0, 0, 0))
+    right_text = render_label(">", (0, 0, 0))
+    select_text = render_label("Select", (0, 0, 0))
+    
+    # Display text on the respective UI elements
+    menu_surface.blit(left_text, left_text.get_rect(center=left_arrow.center))
+    menu_surface.blit(right_text, right_text.get_rect(center=right_arrow.center))
+    menu_surface.blit(select_text, select_text.get_rect(center=select_button.center))
+
+def ship_selection_event(event):
+    global ship_index, selected_ship, redraw
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        if left_arrow.collidepoint(event.pos):  # Decrease ship_index to show previous ship
+            ship_index = (ship_index - 1) % len(ship_images)
+            redraw = True
+        elif right_arrow.collidepoint(event.pos):  # Increase ship_index to show next ship
+            ship_index = (ship_index + 1) % len(ship_images)
+            redraw = True
+        elif select_button.collidepoint(event.pos):  # Select current ship and start the game
+            selected_ship = ship_images[ship_index]
+            change_state(PLAYING)
+
+# Game over screen: draw and input handling
+def draw_end_game():
+    menu_surface.fill((30, 30, 30))  # Fill background with dark gray
+    
+    # Display Game Over text in red
+    game_over_surf = render_label("Game Over", (255, 0, 0))
+    game_over_rect = game_over_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 3))
+    menu_surface.blit(game_over_surf, game_over_rect)
+    
+    # Display the final score in white
+    score_surf = render_label(f"Score: {score}", (255, 255, 255))
+    score_rect = score_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+    menu_surface.blit(score_surf, score_rect)
+    
+    # High score table on the right, the round just played highlighted
+    if leaderboard:
+        draw_high_scores()
+
+    # Create buttons: Play Again and Back to Menu
+    create_button("Play Again", *play_again_rect, (0, 0, 0), (255, 255, 255))
+    create_button("Back to Menu", *back_to_menu_rect, (0, 0, 0), (255, 255, 255))
+
+def draw_high_scores():
+    title_surf = render_label("High Scores", (255, 255, 255))
+    menu_surface.blit(title_surf, title_surf.get_rect(center=(WINDOW_WIDTH - 250, 140)))
+    for rank, (entry_score, _, _) in enumerate(leaderboard.top()):
+        color = (255, 220, 0) if rank == last_rank else (200, 200, 200)
+        rank_surf = text_cache.render(small_font, f"{rank + 1}.", color)
+        score_surf = text_cache.render(small_font, str(entry_score), color)
+        y = 200 + rank * 40
+        menu_surface.blit(rank_surf, rank_surf.get_rect(topright=(WINDOW_WIDTH - 300, y)))
+        menu_surface.blit(score_surf, score_surf.get_rect(topleft=(WINDOW_WIDTH - 280, y)))
+
+def end_game_event(event):
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        if play_again_rect.collidepoint(event.pos):  # Restart the game with a new ship selection
+            change_state(SHIP_SELECT)
+        elif back_to_menu_rect.collidepoint(event.pos):  # Go back to the main menu
+            change_state(MENU)
+
+# Draw function and event handler of every menu screen
+MENU_SCREENS = {
+    MENU: (draw_main_menu, main_menu_event),
+    SHIP_SELECT: (draw_ship_selection, ship_selection_event),
+    GAME_OVER: (draw_end_game, end_game_event),
+}
+
+# Set up a new game; the seed decides every meteor and star, a fresh one is picked if it is None
+def start_game(seed=None):
+    global game_running, player, score, elapsed_time, spawn_timer, sim_accumulator, rewound_round
+
+    load_game_assets()  # No-op after the first game
+    if seed is None:
+        seed = int.from_bytes(os.urandom(4), 'little')
+    rng.seed(seed)
+    game_running = True
     score = 0  # Reset the score at the start of each new game
+    elapsed_time = 0
+    spawn_timer = 0
+    sim_accumulator = 0
+    if governor:
+        governor.reset()  # Every round starts at full quality, whatever the last one ended on
+        apply_quality(0)
     clear_game_objects()  # Clear previous game objects
 
     player = Player(all_sprites, selected_ship)  # Create player object
-
-    # Add stars to the background
-    for _ in range(20):
-        all_sprites.add(Star(all_sprites, star_surf))
-    
-    # Event to spawn meteors periodically
-    meteor_event = pygame.USEREVENT + 1
-    pygame.time.set_timer(meteor_event, 200)  # Set meteor spawn interval
-    
-    # Track the start time of the game to calculate score
-    start_time = pygame.time.get_ticks()
-
-    while game_running:
-        dt = clock.tick(60) / 1000  # Time difference per frame (in seconds)
-
-        # Update score based on the time since the game started
-        score = (pygame.time.get_ticks() - start_time) // 100 
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            if event.type == meteor_event:
-                # Spawn a new meteor
-                Meteor(meteor_surf, (randint(0, WINDOW_WIDTH), randint(-100, 0)), (all_sprites, meteor_sprites))
-        
-        all_sprites.update(dt)  # Update all sprites
-        check_collisions()  # Check for collisions (player with meteors, lasers with meteors)
-
-        display_surface.fill('#3a2e3f')  # Fill the screen with a background color
-        all_sprites.draw(display_surface)  # Draw all sprites (player, meteors, lasers, etc.)
-
-        display_score()  # Display the score on the screen
-
-        pygame.display.update()  # Update the screen
-
-    main_menu()  # If game ends, show the main menu again
-
-def end_game():
-    global game_running
+    if recorder:
+        recorder.start(seed, ship_images.index(selected_ship), ENTITY_ENGINE, MAX_SIM_STEPS)
+        player.controls = recorder.controls  # Read the keyboard through the recorder
+
+    create_starfield()  # Add stars to the background
+    audio.play_music(MUSIC_FILE, volume=0.4)
+    if rewind_buffer:
+        rewind_buffer.clear()  # No rewinding into the previous round
+    rewound_round = False
     
-    # Button dimensions and positions
-    button_width, button_height = 280, 110
-    play_again_x = WINDOW_WIDTH // 2 - 275
-    back_to_menu_x = WINDOW_WIDTH // 2 + 25
-    button_y = WINDOW_HEIGHT // 1.5
+    clock.tick()  # Restart frame timing, so time spent in the menus does not count as the first frame
+
+# One frame of the game
+def play_frame(dt=None):
+    global redraw_all, last_rank, rewound_round
+    if dt is None:
+        dt = clock.tick(RENDER_FPS) / 1000  # Time difference per frame (in seconds)
+    frame_start = perf_counter()  # Work time, without the wait in clock.tick(), is what the governor judges
+    profiler.begin_frame()  # Cheap no-ops while the profiler is off
+    audio.end_frame()  # Sounds are de-duplicated per frame
+
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            exit()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            profiler.toggle()
+            redraw_all = True  # Paint over the overlay when it is switched off
+    profiler.mark()
     
-    while not game_running:
-        display_surface.fill((30, 30, 30))  # Fill background with dark gray
-        
-        # Display Game Over text in red
-        game_over_surf = font.render("Game Over", True, (255, 0, 0))
-        game_over_rect = game_over_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 3))
-        display_surface.blit(game_over_surf, game_over_rect)
-        
-        # Display the final score in white
-        score_surf = font.render(f"Score: {score}", True, (255, 255, 255))
-        score_rect = score_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-        display_surface.blit(score_surf, score_rect)
-        
-        # Create buttons: Play Again and Back to Menu
-        play_again_rect = create_button("Play Again", play_again_x, button_y, button_width, button_height, (0, 0, 0), (255, 255, 255))
-        back_to_menu_rect = create_button("Back to Menu", back_to_menu_x, button_y, button_width, button_height, (0, 0, 0), (255, 255, 255))
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # Handle quit event
-                pygame.quit()
-                exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if play_again_rect.collidepoint(event.pos):  # Restart the game with a new ship selection
-                    selected_ship = ship_selection_menu()
-                    game_running = True
-                    game_loop(selected_ship)
-                elif back_to_menu_rect.collidepoint(event.pos):  # Go back to the main menu
-                    game_running = False
-                    main_menu()
-        
-        pygame.display.update()  # Update display to show changes
-
+    rewound = None
+    if rewind_buffer and pygame.key.get_pressed()[pygame.K_BACKSPACE]:
+        rewound = rewind_buffer.rewind()  # One recorded frame back per frame shown
+    if rewound is not None:
+        restore_snapshot(rewound)
+        rewound_round = True
+    else:
+        steps = sim_stats['steps']
+        simulate(dt)  # Fixed steps: score, spawns, movement and collisions
+        if rewind_buffer and sim_stats['steps'] > steps:  # A frame that ran no step left nothing new to store
+            rewind_buffer.push(snapshot(), elapsed_time)
+    profiler.mark()
+
+    dirty_rects = draw_game(interpolation_alpha())  # Draw the background, sprites and score
+    if profiler.enabled:
+        overlay_rect = profiler.draw(display_surface)  # Frame-time graph on top of everything
+        if dirty_rects is not None:
+            dirty_rects.append(overlay_rect)
+    profiler.mark()
+    present(dirty_rects)  # Push the changed areas to the screen
+    profiler.mark()
+    if profiler.enabled:
+        profiler.end_frame(entity_counts())
+
+    if recorder:
+        recorder.record_frame(dt, quality_tier)
+    if governor and governor.record((perf_counter() - frame_start) * 1000):
+        apply_quality(governor.tier)  # Takes effect from the next frame
+    if not game_running:
+        if recorder:
+            recorder.finish(score)  # Save the round for replay.py
+        if leaderboard:
+            # Ranked now, written to disk in the background; a rewound round could have dodged its hits, so it does not count
+            last_rank = leaderboard.submit(score, selected_ship) if not rewound_round else None
+        change_state(GAME_OVER)  # The player was hit, show the game over screen
+
+# Run a single iteration of the current screen
+def step(dt=None):
+    """Play one frame, or wait for and handle one menu event (repainting the menu first if needed)."""
+    global redraw
+    if state == PLAYING:
+        play_frame(dt)
+        return
+    draw_screen, handle_event = MENU_SCREENS[state]
+    if redraw:
+        draw_screen()
+        present_menu()
+        redraw = False
+    event = wait_for_menu_event()  # Sleep until there is input
+    if event.type in REDRAW_EVENTS:
+        redraw = True
+    else:
+        handle_event(event)
+
+# The game's only loop
+def run():
+    change_state(MENU)  # Begin with the main menu
+    while True:
+        step()
 
-# Start the main menu
-main_menu()  # Begin with the main menu
\ No newline at end of file
+# Start the game (importing this module, e.g. from headless.py, does not start the game)
+if __name__ == '__main__':
+    run()
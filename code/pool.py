@@ -0,0 +1,51 @@
+import pygame
+
+# Free-list of killed sprites that are re-armed instead of constructed again
+class Pool:
+    def __init__(self, sprite_class):
+        self.sprite_class = sprite_class  # PooledSprite subclass this pool hands out
+        self.free = []  # Released sprites waiting to be reused
+        self.created = 0  # Sprites ever constructed by this pool
+        self.reused = 0  # Times a released sprite was re-armed
+
+    def acquire(self, *args):
+        """Return a live sprite armed with args, reusing a released one when possible."""
+        if self.free:
+            sprite = self.free.pop()
+            sprite.spawn(*args)  # Re-arm the old instance in place
+            self.reused += 1
+        else:
+            sprite = self.sprite_class(*args)
+            sprite.pool = self
+            self.created += 1
+        return sprite
+
+    def release(self, sprite):
+        """Take back a sprite that has been removed from all of its groups."""
+        self.free.append(sprite)
+
+    def active(self):
+        """Return how many sprites from this pool are currently in use."""
+        return self.created - len(self.free)
+
+    def stats(self):
+        """Return the pool size counters."""
+        return {'created': self.created, 'reused': self.reused, 'free': len(self.free), 'active': self.created - len(self.free)}
+
+# Sprite that is set up by spawn() and returns itself to its pool when killed
+class PooledSprite(pygame.sprite.Sprite):
+    def __init__(self, *args):
+        super().__init__()
+        self.pool = None  # Set by Pool.acquire, sprites built directly are simply dropped on kill
+        self.spawn(*args)
+
+    def spawn(self, *args):
+        """(Re)initialize the sprite; subclasses take the same arguments as their constructor."""
+        raise NotImplementedError
+
+    def kill(self):
+        """Remove the sprite from all groups and hand it back to its pool."""
+        if self.alive():  # Killing twice must not release it twice
+            super().kill()
+            if self.pool:
+                self.pool.release(self)
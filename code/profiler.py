@@ -0,0 +1,119 @@
+import json
+import os
+from time import perf_counter
+
+import pygame
+
+PHASE_COLORS = ((120, 120, 255), (80, 200, 120), (240, 180, 60), (230, 90, 90), (180, 120, 220))
+BUDGET_MS = 1000 / 60  # One frame at 60 FPS
+
+# Times the phases of every frame into a ring buffer, draws them as a graph and writes a Chrome trace
+class FrameProfiler:
+    def __init__(self, phases, capacity=240, font=None, trace_path='profile_trace.json'):
+        self.phases = phases  # Phase names, in the order mark() is called during a frame
+        self.capacity = capacity  # Frames kept in the ring buffer (and drawn in the graph)
+        self.font = font  # Font for the overlay text, a default one is used if None
+        self.trace_path = trace_path  # Where dump() writes the trace, None to never write one
+        self.enabled = False
+        self.frames = [None] * capacity  # Ring buffer of (start time, phase durations, entity counts)
+        self.recorded = 0  # Frames ever recorded, the next one goes to frames[recorded % capacity]
+        self.times = []  # Timestamps of the frame being measured
+        self.origin = None  # Time of the first recorded frame, trace timestamps are relative to it
+        self.panel = None  # Surface the overlay is drawn on, reused every frame
+
+    def toggle(self):
+        """Switch profiling (and the overlay) on or off."""
+        self.enabled = not self.enabled
+        self.times = []
+        return self.enabled
+
+    def begin_frame(self):
+        """Start timing a frame."""
+        if self.enabled:
+            self.times = [perf_counter()]
+
+    def mark(self):
+        """End the current phase (phases are timed back to back, in the order of self.phases)."""
+        if self.enabled:
+            self.times.append(perf_counter())
+
+    def end_frame(self, counts):
+        """Store the finished frame with its entity counts (a dict of name -> number)."""
+        times = self.times
+        if not self.enabled or len(times) != len(self.phases) + 1:
+            return  # Profiling was switched on part way through this frame
+        if self.origin is None:
+            self.origin = times[0]
+        durations = tuple(end - start for start, end in zip(times, times[1:]))
+        self.frames[self.recorded % self.capacity] = (times[0], durations, counts)
+        self.recorded += 1
+        self.times = []
+
+    def history(self):
+        """Return the recorded frames, oldest first."""
+        if self.recorded <= self.capacity:
+            return self.frames[:self.recorded]
+        split = self.recorded % self.capacity
+        return self.frames[split:] + self.frames[:split]
+
+    def draw(self, surface, pos=(10, 10)):
+        """Draw the frame-time graph, the last frame's phases and entity counts; returns the area covered."""
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        frames = self.history()
+        labels = []
+        if frames:
+            _, durations, counts = frames[-1]
+            phase_text = '  '.join(f'{phase} {duration * 1000:.2f}' for phase, duration in zip(self.phases, durations))
+            count_text = '  '.join(f'{name} {count}' for name, count in counts.items())
+            labels = [self.font.render(f'frame {sum(durations) * 1000:.2f} ms', True, (240, 240, 240)),
+                      self.font.render(phase_text, True, (200, 200, 200)),
+                      self.font.render(count_text, True, (200, 200, 200))]
+        line_height = self.font.get_linesize()
+        graph_height = 100
+        scale = graph_height / (BUDGET_MS * 2)  # Pixels per millisecond, two frame budgets fit in the graph
+        width = max([self.capacity] + [label.get_width() for label in labels]) + 10
+        height = graph_height + 10 + line_height * 3
+        if self.panel is None or self.panel.get_width() < width:  # Only ever grows, a narrower panel would leave old pixels behind
+            self.panel = pygame.Surface((width, height)).convert()  # Opaque, in the display format: blitted as a plain copy
+        panel = self.panel
+        panel.fill((20, 20, 25))
+
+        # One stacked bar per frame, newest on the right
+        bottom = graph_height + 5
+        x = 5 + self.capacity - len(frames)
+        for _, durations, _ in frames:
+            y = bottom
+            for duration, color in zip(durations, PHASE_COLORS):
+                top = max(5, y - duration * 1000 * scale)
+                if top < y:
+                    pygame.draw.line(panel, color, (x, y), (x, top))
+                y = top
+            x += 1
+        budget_y = bottom - BUDGET_MS * scale
+        pygame.draw.line(panel, (255, 255, 255), (5, budget_y), (5 + self.capacity, budget_y))  # 16.6 ms line
+
+        for row, label in enumerate(labels):
+            panel.blit(label, (5, bottom + 5 + row * line_height))
+        return surface.blit(panel, pos)
+
+    def trace_events(self):
+        """Return the recorded frames as Chrome trace events (one slice per phase, plus entity counters)."""
+        events = []
+        for start, durations, counts in self.history():
+            timestamp = (start - self.origin) * 1e6  # Microseconds
+            events.append({'name': 'frame', 'ph': 'X', 'ts': timestamp, 'dur': sum(durations) * 1e6, 'pid': 1, 'tid': 1})
+            for phase, duration in zip(self.phases, durations):
+                events.append({'name': phase, 'ph': 'X', 'ts': timestamp, 'dur': duration * 1e6, 'pid': 1, 'tid': 1})
+                timestamp += duration * 1e6
+            events.append({'name': 'entities', 'ph': 'C', 'ts': (start - self.origin) * 1e6, 'pid': 1, 'args': counts})
+        return events
+
+    def dump(self):
+        """Write the ring buffer as a Chrome trace (open it in chrome://tracing or Perfetto) if anything was recorded."""
+        if not self.recorded or not self.trace_path:
+            return None
+        os.makedirs(os.path.dirname(self.trace_path) or '.', exist_ok=True)
+        with open(self.trace_path, 'w') as file:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, file)
+        return self.trace_path
@@ -0,0 +1,72 @@
+import pygame
+
+# Batched sprite drawing: sprites are sorted into one draw list per layer, grouped by source image so blits of the
+# same image follow each other, and each layer goes to the surface in a single Surface.fblits call
+def draw_lists(sprites, layer_count):
+    """Return one dict per layer, back to front, mapping each source image to the (image, topleft) blits that use it."""
+    layers = [{} for _ in range(layer_count)]
+    for sprite in sprites:
+        image = sprite.image
+        textures = layers[sprite.layer]
+        blits = textures.get(image)
+        if blits is None:
+            blits = textures[image] = []
+        blits.append((image, sprite.rect.topleft))
+    return layers
+
+def draw_batched(surface, sprites, layer_count, after_layer=None):
+    """Draw sprites layer by layer (by their `layer` attribute) with one fblits call per layer; after_layer maps a layer
+    index to a function that draws more on top of that layer, under the next one. Returns the sprites' rects."""
+    for layer, textures in enumerate(draw_lists(sprites, layer_count)):
+        if textures:
+            batch = []
+            for blits in textures.values():
+                batch += blits
+            surface.fblits(batch)
+        if after_layer and layer in after_layer:
+            after_layer[layer]()
+    return [sprite.rect.copy() for sprite in sprites]
+
+def clear_rects(surface, background, rects):
+    """Paint the background over the given areas in one call."""
+    surface.blits([(background, rect, rect) for rect in rects], doreturn=False)
+
+def compare(counts=(1000, 5000, 10000), frames=60, seed=0):
+    """Time drawing `count` mixed sprites with Group.draw against draw_batched."""
+    from statistics import median
+    from time import perf_counter
+    import bench
+    import main as game
+
+    results = {}
+    for count in counts:
+        per_kind = count // len(bench.KINDS)
+        sim = bench.HeadlessGame(seed=seed)
+        game.star_sprites.empty()  # The population below brings its own stars
+        timings = {'Group.draw': [], 'fblits batches': []}
+        textures = 0
+        for _ in range(frames):
+            game.all_sprites.update(sim.dt)  # New rotation and explosion frames, outside the timed part
+            bench.top_up(per_kind)
+            sprites = game.star_sprites.sprites() + game.all_sprites.sprites()  # Stars, player, lasers, meteors and explosions interleaved
+            mixed = pygame.sprite.RenderUpdates(sprites)
+            start = perf_counter()
+            mixed.draw(game.display_surface)
+            after_group = perf_counter()
+            draw_batched(game.display_surface, sprites, len(game.SPRITE_LAYERS))
+            after_batched = perf_counter()
+            mixed.empty()
+            timings['Group.draw'].append((after_group - start) * 1000)
+            timings['fblits batches'].append((after_batched - after_group) * 1000)
+            textures = sum(len(layer) for layer in draw_lists(sprites, len(game.SPRITE_LAYERS)))
+        results[count] = {path: median(samples) for path, samples in timings.items()}
+        group_ms, batched_ms = results[count].values()
+        print(f'{count:>6} sprites: Group.draw {group_ms:7.3f} ms, fblits batches {batched_ms:7.3f} ms '
+              f'({group_ms / batched_ms:.2f}x, {textures} draw lists in {len(game.SPRITE_LAYERS)} layers)')
+        game.clear_game_objects()
+    return results
+
+if __name__ == '__main__':
+    import os
+    os.environ['SPACESHOOTER_HEADLESS'] = '1'
+    compare()
@@ -0,0 +1,140 @@
+import os
+import struct
+import zlib
+from time import perf_counter, strftime
+
+import pygame
+
+RECORDING_MAGIC = b'SSIR'
+RECORDING_VERSION = 4  # 2: rounds run on the fixed-step simulation, 3: quality tier per frame, 4: simulation step limit
+RECORDING_HEADER = struct.Struct('<4sHIBBBIIi')  # magic, version, seed, ship index, engine, max steps per frame, frames, score, death frame (-1 if none)
+FRAME = struct.Struct('<HB')  # frame time in milliseconds, held keys as bits of INPUT_KEYS with the quality tier above them
+
+# Every key the game reads; bit i of a recorded frame is INPUT_KEYS[i]
+INPUT_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_SPACE)
+TIER_SHIFT = len(INPUT_KEYS)  # The quality governor's tier is stored in the bits above the keys
+ENGINES = ('sprites', 'arrays')  # Entity engines, stored by index; a round only replays identically on the engine it was played with
+
+# Stand-in for pygame.key.get_pressed() that reports a fixed set of held keys
+class ScriptedKeys:
+    def __init__(self, held=()):
+        self.held = frozenset(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+def encode_keys(pressed):
+    """Pack the state of INPUT_KEYS from a get_pressed() style lookup into bits."""
+    bits = 0
+    for bit, key in enumerate(INPUT_KEYS):
+        if pressed[key]:
+            bits |= 1 << bit
+    return bits
+
+def decode_keys(bits):
+    """Return the keys held in a recorded frame."""
+    return ScriptedKeys(key for bit, key in enumerate(INPUT_KEYS) if bits >> bit & 1)
+
+# One recorded round: the seed, ship, engine and step limit it started with, the input and frame time of every frame and its outcome
+class Recording:
+    def __init__(self, seed, ship_index, engine='sprites', max_steps=8, frames=None, score=0, death_frame=None):
+        self.seed = seed
+        self.ship_index = ship_index
+        self.engine = engine
+        self.max_steps = max_steps  # Simulation steps a frame may run: a slow frame drops different time under another limit
+        self.frames = frames if frames is not None else []  # (milliseconds, key bits) per frame
+        self.score = score
+        self.death_frame = death_frame
+
+    def save(self, path):
+        """Write the recording: a fixed header followed by the zlib-compressed frames."""
+        header = RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, self.seed, self.ship_index, ENGINES.index(self.engine), self.max_steps,
+                                       len(self.frames), self.score, -1 if self.death_frame is None else self.death_frame)
+        body = b''.join(FRAME.pack(ms, bits) for ms, bits in self.frames)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(header)
+            file.write(zlib.compress(body, 9))  # Input barely changes between frames, so it compresses very well
+
+    @classmethod
+    def load(cls, path):
+        """Read a recording written by save()."""
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, seed, ship_index, engine, max_steps, frame_count, score, death_frame = RECORDING_HEADER.unpack_from(data)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            raise ValueError(f'{path} is not a version {RECORDING_VERSION} input recording')
+        frames = list(FRAME.iter_unpack(zlib.decompress(data[RECORDING_HEADER.size:])))
+        if len(frames) != frame_count:
+            raise ValueError(f'{path} is truncated: {len(frames)} of {frame_count} frames')
+        return cls(seed, ship_index, ENGINES[engine], max_steps, frames, score, None if death_frame < 0 else death_frame)
+
+# Captures the live game's input frame by frame and saves one recording per round
+class InputRecorder:
+    def __init__(self, folder):
+        self.folder = folder  # Recordings are written here, one file per round
+        self.recording = None
+        self.held = 0  # Key bits read during the current frame
+
+    def start(self, seed, ship_index, engine, max_steps):
+        """Begin recording a round."""
+        self.recording = Recording(seed, ship_index, engine, max_steps)
+        self.held = 0
+
+    def controls(self):
+        """Player input source: read the keyboard, remember the keys for this frame and report only what is recorded."""
+        self.held = encode_keys(pygame.key.get_pressed())
+        return decode_keys(self.held)  # The live game sees exactly what a replay will see
+
+    def record_frame(self, dt, tier=0):
+        """Store the frame that was just simulated (dt must be whole milliseconds, as clock.tick() gives) and its quality tier."""
+        self.recording.frames.append((min(round(dt * 1000), 0xFFFF), self.held | tier << TIER_SHIFT))  # Longer stalls are capped by the simulation anyway
+
+    def finish(self, score):
+        """Save the round that just ended (on the frame the player was hit) and return the file name."""
+        recording = self.recording
+        recording.score = score
+        recording.death_frame = len(recording.frames) - 1
+        path = os.path.join(self.folder, f'{strftime("%Y%m%d-%H%M%S")}-{recording.seed}.rec')
+        recording.save(path)
+        self.recording = None
+        return path
+
+def replay(recording, draw=False):
+    """Play a recording back as fast as possible; returns the outcome and the frames per second achieved."""
+    from headless import HeadlessGame
+    import main as game
+
+    game.MAX_SIM_STEPS = recording.max_steps  # Read by every frame, so the round drops time exactly where it did live
+    sim = HeadlessGame(seed=recording.seed, selected_ship=game.ship_images[recording.ship_index], draw=draw)
+    start = perf_counter()
+    for ms, bits in recording.frames:
+        if bits >> TIER_SHIFT != game.quality_tier:
+            game.apply_quality(bits >> TIER_SHIFT)  # Frozen rotation changes collisions, so tiers are replayed too
+        if not sim.step(decode_keys(bits).held, dt=ms / 1000):
+            break
+    elapsed = perf_counter() - start
+    return sim.result(), sim.frame / elapsed if elapsed else 0.0
+
+if __name__ == '__main__':
+    import argparse
+
+    os.environ['SPACESHOOTER_HEADLESS'] = '1'
+    parser = argparse.ArgumentParser(description='Replay recorded rounds at full speed and check they end the same way.')
+    parser.add_argument('recordings', nargs='+', help='.rec files written with SPACESHOOTER_RECORD set')
+    parser.add_argument('--draw', action='store_true', help='also render each frame to the dummy display')
+    args = parser.parse_args()
+    import main as game
+
+    mismatches = 0
+    for path in args.recordings:
+        recording = Recording.load(path)
+        if recording.engine != game.ENTITY_ENGINE:  # Chosen when the game is imported, from any settings source
+            raise SystemExit(f'{path} was played with the {recording.engine} engine, set SPACESHOOTER_ENGINE={recording.engine}')
+        result, speed = replay(recording, args.draw)
+        same = (result['score'], result['death_frame']) == (recording.score, recording.death_frame)
+        mismatches += not same
+        print(f"{path}: {result['frames']} frames at {speed:.0f} frames/s, score {result['score']} (recorded {recording.score}), "
+              f"death frame {result['death_frame']} (recorded {recording.death_frame}) {'OK' if same else 'MISMATCH'}")
+    if mismatches:
+        raise SystemExit(f'{mismatches} of {len(args.recordings)} recordings did not replay identically')
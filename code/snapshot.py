@@ -0,0 +1,170 @@
+import struct
+from array import array
+from collections import deque
+from math import ceil, isnan, nan
+
+SNAPSHOT_MAGIC = b'SNAP'
+SNAPSHOT_VERSION = 1
+# magic, version, engine (0 sprites, 1 arrays), sprite records, stars, array meteors, array lasers, score, quality tier,
+# game running, round time, spawn timer, simulation accumulator, gauss_next of the RNG (NaN for None)
+SNAPSHOT_HEADER = struct.Struct('<4sHBIIIIiBBdddd')
+RECORD_FIELDS = 11  # kind, x, y, previous x, previous y and six values that depend on the kind (see main.snapshot)
+ENGINES = ('sprites', 'arrays')
+
+def pack_snapshot(round_state, records, stars, rng_state, engine_data=b''):
+    """Pack a round into bytes: header, sprite records and star centres as doubles, RNG words, then the array engine's columns."""
+    _, words, gauss_next = rng_state
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, ENGINES.index(round_state['engine']), len(records) // RECORD_FIELDS,
+                                  len(stars) // 2, round_state['meteors'], round_state['lasers'], round_state['score'], round_state['tier'],
+                                  round_state['running'], round_state['elapsed_time'], round_state['spawn_timer'],
+                                  round_state['sim_accumulator'], nan if gauss_next is None else gauss_next)
+    return b''.join((header, array('d', records).tobytes(), array('d', stars).tobytes(), array('I', words).tobytes(), engine_data))
+
+def unpack_snapshot(data):
+    """Split snapshot bytes into (round state, sprite records, star centres, RNG state, array engine bytes)."""
+    (magic, version, engine, sprite_count, star_count, meteors, lasers, score, tier, running,
+     elapsed_time, spawn_timer, sim_accumulator, gauss_next) = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError('not a game snapshot of this version')
+    round_state = {'engine': ENGINES[engine], 'meteors': meteors, 'lasers': lasers, 'score': score, 'tier': tier, 'running': bool(running),
+                   'elapsed_time': elapsed_time, 'spawn_timer': spawn_timer, 'sim_accumulator': sim_accumulator}
+    view = memoryview(data)
+    offset = SNAPSHOT_HEADER.size
+    records = array('d')
+    records.frombytes(view[offset:offset + sprite_count * RECORD_FIELDS * 8])
+    offset += sprite_count * RECORD_FIELDS * 8
+    stars = array('d')
+    stars.frombytes(view[offset:offset + star_count * 16])
+    offset += star_count * 16
+    words = array('I')
+    words.frombytes(view[offset:offset + 625 * 4])  # Mersenne Twister state and position, as Random.getstate() has them
+    offset += 625 * 4
+    rng_state = (3, tuple(words), None if isnan(gauss_next) else gauss_next)
+    return round_state, records, stars, rng_state, view[offset:]
+
+# The last few seconds of snapshots in one ring buffer: new snapshots overwrite the oldest ones. The buffer holds
+# seconds * rate snapshots of the largest size seen (one more for the gap left when wrapping around), so it is
+# only reallocated when the round gets busier than it has been so far
+class RewindBuffer:
+    def __init__(self, seconds=5, rate=120):
+        self.seconds = seconds  # Round time kept
+        self.slots = ceil(seconds * rate) + 2  # Snapshots the buffer must hold: at most `rate` are pushed per second
+        self.largest = 0  # Largest snapshot seen, in bytes
+        self.buffer = bytearray()  # Sized on the first push
+        self.entries = deque()  # (offset, size, round time) of every stored snapshot, oldest first
+        self.head = 0  # Where the next snapshot is written
+        self.stats = {'pushed': 0, 'evicted': 0, 'rewound': 0, 'resized': 0}
+
+    def push(self, data, time):
+        """Store a snapshot taken at the given round time, dropping the oldest ones that are too old or in the way."""
+        size = len(data)
+        if size > self.largest:
+            self.largest = size
+            if size * self.slots > len(self.buffer):
+                self.resize(size * self.slots * 5 // 4)  # Some headroom, so a slowly growing round does not resize every frame
+        if self.head + size > len(self.buffer):
+            self.head = 0  # Wrap around, a snapshot is always stored in one piece
+        entries = self.entries
+        while entries:
+            offset, length, taken = entries[0]
+            overlaps = offset < self.head + size and self.head < offset + length
+            if not overlaps and time - taken <= self.seconds:
+                break
+            entries.popleft()
+            self.stats['evicted'] += 1
+        self.buffer[self.head:self.head + size] = data
+        entries.append((self.head, size, time))
+        self.head += size
+        self.stats['pushed'] += 1
+
+    def rewind(self):
+        """Drop the newest snapshot and return the one before it (a view into the buffer), or None if there is none."""
+        if len(self.entries) < 2:
+            return None
+        offset, size, _ = self.entries.pop()
+        self.head = offset  # Its space is free again
+        self.stats['rewound'] += 1
+        offset, size, _ = self.entries[-1]
+        return memoryview(self.buffer)[offset:offset + size]
+
+    def resize(self, capacity):
+        """Move the stored snapshots, oldest first, to the start of a new buffer of the given size."""
+        buffer = bytearray(capacity)
+        view = memoryview(self.buffer)
+        head = 0
+        for index, (offset, size, taken) in enumerate(self.entries):
+            buffer[head:head + size] = view[offset:offset + size]
+            self.entries[index] = (head, size, taken)
+            head += size
+        view.release()
+        self.buffer, self.head = buffer, head
+        self.stats['resized'] += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.head = 0
+
+    def duration(self):
+        """Return the round time covered by the stored snapshots."""
+        return self.entries[-1][2] - self.entries[0][2] if self.entries else 0
+
+def measure(populations=(100, 300, 1000), repeats=200, seed=0):
+    """Time snapshot and restore with `population` sprites and check a restored round plays on exactly like the original."""
+    from statistics import median
+    from time import perf_counter
+    import headless
+    import main as game
+
+    for population in populations:
+        sim = headless.HeadlessGame(seed=seed)
+        rng = game.rng
+        for _ in range(population // 3):  # Meteors, lasers and explosions in equal parts, on either engine
+            game.spawn_meteor()
+            game.fire_laser((rng.randint(0, game.WINDOW_WIDTH), rng.randint(0, game.WINDOW_HEIGHT)))
+            game.spawn_explosion((rng.randint(0, game.WINDOW_WIDTH), rng.randint(0, game.WINDOW_HEIGHT)))
+        entities = len(game.all_sprites) + len(game.star_sprites) + sum(game.entity_counts()[kind] for kind in ('meteors', 'lasers'))
+        if not game.entity_engine:
+            entities -= len(game.meteor_sprites) + len(game.laser_sprites)  # Already counted as sprites
+        saved = game.snapshot()
+        timings = {'snapshot': [], 'restore': []}
+        for _ in range(repeats):
+            start = perf_counter()
+            data = game.snapshot()
+            after_snapshot = perf_counter()
+            game.restore_snapshot(data)
+            after_restore = perf_counter()
+            timings['snapshot'].append((after_snapshot - start) * 1000)
+            timings['restore'].append((after_restore - after_snapshot) * 1000)
+        same = game.snapshot() == saved
+        print(f'{entities:>6} entities: snapshot {median(timings["snapshot"]):.3f} ms, '
+              f'restore {median(timings["restore"]):.3f} ms, {len(saved)} bytes, round trip exact: {same}')
+        game.clear_game_objects()
+
+    # Play a round, snapshot it halfway and check that playing on from the restored snapshot gives the same end
+    sim = headless.HeadlessGame(seed=seed)
+    for frame in range(300):
+        sim.step(headless.strafe_script(frame))
+    halfway = game.snapshot()
+    endings = []
+    for restored in (False, True):
+        if restored:
+            game.restore_snapshot(halfway)
+        for frame in range(300, 900):
+            sim.step(headless.strafe_script(frame))
+        endings.append(game.snapshot())
+    print('restored round plays on identically' if endings[0] == endings[1] else 'MISMATCH after restoring a snapshot')
+
+    # Fill a rewind buffer with a round at 60 frames per second and report what it holds
+    buffer = RewindBuffer(rate=game.SIM_RATE)
+    sim = headless.HeadlessGame(seed=seed)
+    frame = 0
+    while sim.step(headless.strafe_script(frame)) and frame < 1800:
+        buffer.push(game.snapshot(), game.elapsed_time)
+        frame += 1
+    print(f'rewind buffer: {len(buffer.entries)} snapshots covering {buffer.duration():.2f} s of {frame} frames, '
+          f'{sum(size for _, size, _ in buffer.entries) / 1024:.0f} KiB of {len(buffer.buffer) // 1024} KiB used')
+
+if __name__ == '__main__':
+    import os
+    os.environ['SPACESHOOTER_HEADLESS'] = '1'
+    measure()
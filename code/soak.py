@@ -0,0 +1,80 @@
+import os
+os.environ['SPACESHOOTER_HEADLESS'] = '1'  # Must be set before main initializes pygame
+os.environ.setdefault('SPACESHOOTER_LEADERBOARD', os.path.join('.cache', 'soak_highscores.log'))  # Keep soak rounds off the real high scores
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import pygame
+import main as game
+from headless import ScriptedKeys
+
+def click(pos):
+    """Queue a left click at pos for the current screen to handle."""
+    pygame.event.clear()  # Drop window events, so the click is the next event the screen sees
+    pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+
+def stack_depth():
+    """Return the number of Python frames currently on the stack."""
+    depth = 0
+    frame = sys._getframe()
+    while frame:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+def play_round(round_index, depths):
+    """Go from wherever the game is through ship selection and one game to the game over screen."""
+    if game.state == game.MENU:
+        click(game.button_rect.center)
+        game.step()
+    click(game.right_arrow.center if round_index % 2 else game.left_arrow.center)  # Browse ships
+    game.step()
+    click(game.select_button.center)
+    game.step()
+
+    game.player.controls = lambda: depths.append(stack_depth()) or ScriptedKeys()  # Record depth mid-frame
+    for _ in range(3):
+        game.step(1 / 60)
+    if game.entity_engine:
+        game.entity_engine.spawn_meteor(game.player.rect.center, 0, 0, 0)  # Guarantee the round ends on the next frame
+    else:
+        meteor = game.spawn_meteor()
+        meteor.position.update(game.player.rect.center)  # Guarantee the round ends on the next frame
+        meteor.rect.center = meteor.position
+    while game.state == game.PLAYING:
+        game.step(1 / 60)
+
+    click(game.play_again_rect.center if round_index % 3 else game.back_to_menu_rect.center)
+    game.step()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play many simulated rounds and check memory and stack depth stay flat.')
+    parser.add_argument('--rounds', type=int, default=10000)
+    parser.add_argument('--report-every', type=int, default=1000)
+    args = parser.parse_args()
+
+    game.change_state(game.MENU)
+    tracemalloc.start()
+    depths = []
+    samples = []
+    for round_index in range(args.rounds):
+        play_round(round_index, depths)
+        if (round_index + 1) % args.report_every == 0:
+            gc.collect()
+            memory = tracemalloc.get_traced_memory()[0]
+            samples.append((memory, max(depths)))
+            print(f'round {round_index + 1:>6}: {memory / 1024:8.1f} KiB traced, max stack depth {max(depths)}')
+            depths.clear()
+
+    first_memory, first_depth = samples[0]
+    last_memory, last_depth = samples[-1]
+    growth = last_memory - first_memory
+    print(f'memory growth after the first report: {growth / 1024:.1f} KiB, stack depth {first_depth} -> {last_depth}')
+    print(f'text cache: {game.text_cache.report()}')
+    if game.leaderboard:
+        print(f'leaderboard: {game.leaderboard.report()}')
+    if last_depth != first_depth or growth > 256 * 1024:
+        raise SystemExit('memory or stack depth grew across rounds')
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+import pygame
+
+DIGITS = '0123456789'
+
+# Least-recently-used cache of rendered text, keyed by (text, color, font)
+class TextCache:
+    def __init__(self, capacity=256):
+        self.capacity = capacity  # Rendered strings kept before the least recently used one is dropped
+        self.surfaces = OrderedDict()  # (text, color, font) -> surface, most recently used last
+        self.atlases = {}  # (font, color) -> DigitAtlas
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def render(self, font, text, color):
+        """Return the anti-aliased rendering of text, rasterizing it only if it is not cached."""
+        key = (text, color, font)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            self.stats['hits'] += 1
+            return surf
+        self.stats['misses'] += 1
+        surf = self.surfaces[key] = font.render(text, True, color)
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+            self.stats['evictions'] += 1
+        return surf
+
+    def digits(self, font, color):
+        """Return the digit atlas for a font and color, building it on first use."""
+        key = (font, color)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = self.atlases[key] = DigitAtlas(font, color)
+        return atlas
+
+    def report(self):
+        """Return the counters as one line of text."""
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / lookups if lookups else 0
+        return f"{self.stats['hits']} hits, {self.stats['misses']} misses ({hit_rate:.1%} hit rate), {self.stats['evictions']} evictions"
+
+# The ten digit glyphs rendered once, so numbers are drawn as glyph blits instead of being rasterized
+class DigitAtlas:
+    def __init__(self, font, color):
+        self.glyphs = [font.render(digit, True, color) for digit in DIGITS]  # Indexed by digit value
+        if pygame.display.get_surface():
+            self.glyphs = [glyph.convert_alpha() for glyph in self.glyphs]  # Faster to blit in the display format
+        self.widths = [glyph.get_width() for glyph in self.glyphs]
+        self.height = max(glyph.get_height() for glyph in self.glyphs)
+
+    def get_rect(self, text, **anchor):
+        """Return the area a string of digits covers, placed like Surface.get_rect(**anchor)."""
+        rect = pygame.Rect(0, 0, sum(self.widths[ord(digit) - 48] for digit in text), self.height)
+        for name, value in anchor.items():
+            setattr(rect, name, value)
+        return rect
+
+    def draw(self, surface, value, **anchor):
+        """Blit a non-negative integer digit by digit; returns the area it covers."""
+        text = str(value)
+        rect = self.get_rect(text, **anchor)
+        x, y = rect.topleft
+        blits = []
+        for digit in text:
+            index = ord(digit) - 48  # '0' is 48
+            blits.append((self.glyphs[index], (x, y)))
+            x += self.widths[index]
+        surface.fblits(blits)  # One call for the whole number
+        return rect
+
+def measure_hud(frames=2000):
+    """Time drawing the score with font.render every frame against the digit atlas."""
+    import os
+    from time import perf_counter
+    from os.path import join
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    screen = pygame.display.set_mode((1600, 900))
+    font = pygame.font.Font(join('images', 'Oxanium-Bold.ttf'), 40)
+    atlas = TextCache().digits(font, (240, 240, 240))
+    screen.blit(font.render('0', True, (240, 240, 240)), (0, 0))  # Warm up the glyph cache of the font itself
+    timings = {}
+    for path in ('font.render', 'digit atlas'):
+        start = perf_counter()
+        for frame in range(frames):
+            score = frame // 6  # Changes every 100 ms at 60 FPS, like the real score
+            if path == 'font.render':
+                text_surf = font.render(str(score), True, (240, 240, 240))
+                screen.blit(text_surf, text_surf.get_rect(midbottom=(800, 850)))
+            else:
+                atlas.draw(screen, score, midbottom=(800, 850))
+        timings[path] = (perf_counter() - start) / frames * 1e6
+        print(f'{path:<12} {timings[path]:6.1f} us per frame')
+    return timings
+
+if __name__ == '__main__':
+    measure_hud()
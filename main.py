@@ -1,4 +1,5 @@
 import pygame 
+import os
 from os.path import join
 from random import randint, uniform
 
@@ -20,8 +21,9 @@ explosion_frames = [pygame.image.load(join('images', 'explosion', f'{i}.png')).c
 laser_sound = pygame.mixer.Sound(join('audio', 'laser.wav'))
 laser_sound.set_volume(0.5)
 explosion_sound = pygame.mixer.Sound(join('audio', 'explosion.wav'))
-game_music = pygame.mixer.Sound(join('audio', 'game_music.wav'))
-game_music.set_volume(0.4)
+game_music = pygame.mixer.Sound(join('audio', 'game_music.wav')) if os.path.exists(join('audio', 'game_music.wav')) else None  # Optional track
+if game_music:
+    game_music.set_volume(0.4)
 
 # Button for starting the game
 button_rect = pygame.Rect(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 - 50, 200, 100)